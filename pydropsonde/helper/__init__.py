@@ -1,3 +1,4 @@
+import functools
 import numpy as np
 from . import physics
 import xarray as xr
@@ -222,6 +223,7 @@ def convert_ta_to_si(value):
     return value + 273.15
 
 
+@functools.cache
 def get_si_converter_function_based_on_var(var_name):
     """get the function to convert a variable to SI units based on its name"""
     func_name = f"convert_{var_name}_to_si"
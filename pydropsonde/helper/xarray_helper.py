@@ -29,13 +29,17 @@ def add_ancillary_var(ds, variable, anc_name):
 
 
 def remove_above_alt(ds, variables, alt_dim, maxalt):
+    """
+    set variables to NaN where alt_dim is above maxalt;
+    the mask is computed once and applied to the numpy arrays directly.
+    """
+    alt = ds[alt_dim].values
+    keep = (alt < maxalt) | np.isnan(alt)
     return ds.assign(
         {
             var: (
                 ds[var].dims,
-                xr.where(
-                    (ds[alt_dim] < maxalt) | (np.isnan(ds[alt_dim])), ds[var], np.nan
-                ).values,
+                np.where(keep, ds[var].values, np.nan),
                 ds[var].attrs,
             )
             for var in variables
@@ -165,10 +169,11 @@ def to_file(ds, path, filetype, overwrite=True, **kwargs):
         raise ValueError("Could not write: unrecognized filetype")
 
 
-def write_ds(ds, dir, filename, **kwargs):
+def write_ds(ds, dir, filename, complevel=None, **kwargs):
     """
     standardized way to write level files;
-    includes determination of filetype and encoding
+    includes determination of filetype and encoding.
+    `complevel` sets the zlib compression level of all compressed variables in netCDF files.
     """
     Path(dir).mkdir(parents=True, exist_ok=True)
     if ".nc" in filename:
@@ -178,6 +183,10 @@ def write_ds(ds, dir, filename, **kwargs):
     else:
         raise ValueError("filetype unknown")
     encoding = get_encoding(ds, filetype=filetype, **kwargs)
+    if complevel is not None and filetype == "nc":
+        for enc in encoding.values():
+            if "compression" in enc:
+                enc["complevel"] = int(complevel)
     to_file(
         ds=ds,
         filetype=filetype,
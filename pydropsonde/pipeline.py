@@ -3,7 +3,14 @@ from .helper.__init__ import (
     path_to_flight_ids,
     path_to_l0_files,
 )
-from .processor import Sonde, Gridded
+from .processor import (
+    Sonde,
+    Gridded,
+    run_aspen_batch,
+    write_l2_batch,
+    apply_sonde_methods_batch,
+    clear_dir_cache,
+)
 from .circles import Circle
 import configparser
 import inspect
@@ -112,6 +119,36 @@ def get_nondefaults_from_config(
     return nondefault_args
 
 
+def get_id_variable_names_from_config(config):
+    """
+    Get the ID variable names for `Sonde.add_id_variables` from the sections of the single ID variable methods.
+
+    This keeps config files working that set `variable_name` in the sections of
+    `Sonde.add_sonde_id_variable`, `Sonde.add_platform_id_variable` or `Sonde.add_flight_id_variable`.
+
+    Parameters
+    ----------
+    config : configparser.ConfigParser
+        A ConfigParser object containing configuration settings.
+
+    Returns
+    -------
+    dict
+        A dictionary mapping the arguments of `Sonde.add_id_variables` to the configured variable names.
+    """
+    methods = {
+        "sonde_id_name": Sonde.add_sonde_id_variable,
+        "platform_id_name": Sonde.add_platform_id_variable,
+        "flight_id_name": Sonde.add_flight_id_variable,
+    }
+    names = {}
+    for arg, method in methods.items():
+        nondefault_args = get_nondefaults_from_config(config, method)
+        if "variable_name" in nondefault_args:
+            names[arg] = nondefault_args["variable_name"]
+    return names
+
+
 def get_args_for_function(config, function):
     """
     Get the arguments for a given function.
@@ -136,6 +173,8 @@ def get_args_for_function(config, function):
         A dictionary of arguments for the function.
     """
     args = get_nondefaults_from_config(config, function)
+    if function is Sonde.add_id_variables:
+        args = {**get_id_variable_names_from_config(config), **args}
     mandatory = get_mandatory_args(function)
     if mandatory:
         mandatory_args = get_mandatory_values_from_config(config, mandatory)
@@ -337,6 +376,100 @@ def iterate_Sonde_method_over_dict_of_Sondes_objects(
     return my_dict
 
 
+def iterate_Sonde_method_over_dict_of_Sondes_objects_in_parallel(
+    obj: dict, functions: list, config: configparser.ConfigParser
+) -> dict:
+    """
+    Applies a list of methods to each Sonde in a dictionary, processing the sondes in parallel processes.
+
+    The result is the same as with `iterate_Sonde_method_over_dict_of_Sondes_objects`, but
+    each worker process applies all methods to one sonde, so the sondes need to be independent of each other.
+    The number of worker processes can be set with the `max_workers` option in the OPTIONAL section of the config file.
+
+    Parameters
+    ----------
+    obj : dict
+        A dictionary of Sonde objects.
+    functions : list
+        a list of method names.
+    config : configparser.ConfigParser
+        A ConfigParser object containing configuration settings.
+
+    Returns
+    -------
+    dict
+        A dictionary of Sonde objects with the results of the methods applied to them (keys where results are None are not included).
+    """
+    calls = [
+        (
+            function_name,
+            dict(get_args_for_function(config, getattr(Sonde, function_name))),
+        )
+        for function_name in functions
+    ]
+    max_workers = config.getint("OPTIONAL", "max_workers", fallback=None)
+    return apply_sonde_methods_batch(obj, calls, max_workers=max_workers)
+
+
+def run_aspen_over_dict_of_Sondes_objects(
+    obj: dict, config: configparser.ConfigParser
+) -> dict:
+    """
+    Runs ASPEN and adds the post-ASPEN datasets for a dictionary of Sonde objects in parallel processes.
+
+    The arguments of `Sonde.run_aspen` and `Sonde.add_aspen_ds` are read from the config file as for any other Sonde method.
+    The number of worker processes can be set with the `max_workers` option in the OPTIONAL section of the config file.
+
+    Parameters
+    ----------
+    obj : dict
+        A dictionary of Sonde objects.
+    config : configparser.ConfigParser
+        A ConfigParser object containing configuration settings.
+
+    Returns
+    -------
+    dict
+        A dictionary of Sonde objects with the post-ASPEN datasets added (sondes without valid L1 data are not included).
+    """
+    max_workers = config.getint("OPTIONAL", "max_workers", fallback=None)
+    return run_aspen_batch(
+        obj,
+        max_workers=max_workers,
+        run_aspen_args=get_args_for_function(config, Sonde.run_aspen),
+        add_aspen_ds_args=get_args_for_function(config, Sonde.add_aspen_ds),
+    )
+
+
+def write_l2_over_dict_of_Sondes_objects(
+    obj: dict, config: configparser.ConfigParser
+) -> dict:
+    """
+    Writes the L2 files for a dictionary of Sonde objects in parallel processes.
+
+    The arguments of `Sonde.write_l2` are read from the config file as for any other Sonde method.
+    The number of worker processes can be set with the `max_workers` option in the OPTIONAL section of the config file.
+
+    Parameters
+    ----------
+    obj : dict
+        A dictionary of Sonde objects.
+    config : configparser.ConfigParser
+        A ConfigParser object containing configuration settings.
+
+    Returns
+    -------
+    dict
+        A dictionary of Sonde objects after writing the L2 files.
+    """
+    max_workers = config.getint("OPTIONAL", "max_workers", fallback=None)
+    return write_l2_batch(
+        obj,
+        max_workers=max_workers,
+        **get_args_for_function(config, Sonde.write_l2),
+    )
+
+
 def iterate_Circle_method_over_dict_of_Circle_objects(
     obj: Gridded, functions: list, config: configparser.ConfigParser
 ) -> object:
@@ -468,16 +601,20 @@ def run_pipeline(pipeline: dict, config: configparser.ConfigParser):
     dict:
         The output of the last substep in the pipeline.
     """
+    clear_dir_cache()
     previous_substep_output = None
-    for step in pipeline:
-        print(f"Running {step}...")
-        substep = pipeline[step]
-        if previous_substep_output is None:
-            previous_substep_output = run_substep(None, substep, config)
-        else:
-            previous_substep_output = run_substep(
-                previous_substep_output, substep, config
-            )
+    try:
+        for step in pipeline:
+            print(f"Running {step}...")
+            substep = pipeline[step]
+            if previous_substep_output is None:
+                previous_substep_output = run_substep(None, substep, config)
+            else:
+                previous_substep_output = run_substep(
+                    previous_substep_output, substep, config
+                )
+    finally:
+        clear_dir_cache()
     return previous_substep_output
 
 
@@ -492,15 +629,26 @@ pipeline = {
         "apply": iterate_Sonde_method_over_dict_of_Sondes_objects,
         "functions": [
             "filter_no_launch_detect",
-            "run_aspen",
-            "add_aspen_ds",
+        ],
+        "output": "sondes",
+    },
+    "run_aspen": {
+        "intake": "sondes",
+        "apply": run_aspen_over_dict_of_Sondes_objects,
+        "output": "sondes",
+        "comment": "This step runs ASPEN for all sondes in parallel processes and reads the resulting L1 files.",
+    },
+    "add_L1_history": {
+        "intake": "sondes",
+        "apply": iterate_Sonde_method_over_dict_of_Sondes_objects,
+        "functions": [
             "add_aspen_history",
         ],
         "output": "sondes",
     },
     "qc": {
         "intake": "sondes",
-        "apply": iterate_Sonde_method_over_dict_of_Sondes_objects,
+        "apply": iterate_Sonde_method_over_dict_of_Sondes_objects_in_parallel,
         "functions": [
             "init_qc",
             "detect_floater",
@@ -519,24 +667,27 @@ pipeline = {
     },
     "create_L2": {
         "intake": "sondes",
-        "apply": iterate_Sonde_method_over_dict_of_Sondes_objects,
+        "apply": iterate_Sonde_method_over_dict_of_Sondes_objects_in_parallel,
         "functions": [
             "get_sonde_attributes",
             "add_l2_attributes_to_interim_l2_ds",
-            "add_sonde_id_variable",
-            "add_platform_id_variable",
-            "add_flight_id_variable",
+            "add_id_variables",
             "add_qc_to_l2",
             "get_l2_filename",
             "update_history_l2",
-            "write_l2",
         ],
         "output": "sondes",
-        "comment": "This steps creates the L2 files after the QC (user says how QC flags are used to go from L1 to L2) and then saves these as L2 NC datasets.",
+        "comment": "This steps creates the L2 datasets after the QC (user says how QC flags are used to go from L1 to L2).",
+    },
+    "write_L2": {
+        "intake": "sondes",
+        "apply": write_l2_over_dict_of_Sondes_objects,
+        "output": "sondes",
+        "comment": "This step saves the L2 datasets as L2 NC files in parallel processes.",
     },
     "process_L2": {
         "intake": "sondes",
-        "apply": iterate_Sonde_method_over_dict_of_Sondes_objects,
+        "apply": iterate_Sonde_method_over_dict_of_Sondes_objects_in_parallel,
         "functions": [
             "check_interim_l3",
             "get_l2_filename",
@@ -1,15 +1,19 @@
 import ast
 from dataclasses import dataclass, field, KW_ONLY
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
+import functools
+import json
+import shlex
 from typing import Any, Optional, List
 import os
 import subprocess
 import warnings
 import yaml
+import bottleneck as bn
 import numpy as np
 import xarray as xr
-from xhistogram.xarray import histogram
 
 import pydropsonde.helper as hh
 from pydropsonde.helper.quality import QualityControl
@@ -21,8 +25,207 @@ __version__ = version("pydropsonde")
 
 _no_default = object()
 
+_dir_cache = {}
+_missing_dirs = set()
 
-@dataclass(order=True)
+
+def _scan_dir(directory):
+    """
+    Return a mapping of file names to `os.DirEntry` objects for `directory`.
+
+    The listing is read with a single `os.scandir` call and cached per directory,
+    so that repeated existence checks of sondes from the same flight do not each
+    cost a syscall. Files are only stat'ed when `DirEntry.stat` is called.
+    Missing directories are cached as an empty mapping and recorded in `_missing_dirs`.
+    """
+    listing = _dir_cache.get(directory)
+    if listing is None:
+        try:
+            with os.scandir(directory) as entries:
+                listing = {entry.name: entry for entry in entries}
+        except FileNotFoundError:
+            listing = {}
+            _missing_dirs.add(directory)
+        _dir_cache[directory] = listing
+    return listing
+
+
+def _invalidate_dir(directory):
+    """
+    Drop the cached listing of `directory`, e.g. after new files were written to it.
+    """
+    _dir_cache.pop(directory, None)
+    _missing_dirs.discard(directory)
+
+
+def clear_dir_cache():
+    """
+    Drop all cached directory listings, so that a new pipeline run sees the current state of the file system.
+    """
+    _dir_cache.clear()
+    _missing_dirs.clear()
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_aspen_time(processing_time):
+    """
+    Parse the `ProcessingTime` attribute of a post-ASPEN file to a UTC datetime.
+
+    Sondes processed in one ASPEN run share the same processing time, so the
+    parsed values are cached.
+    """
+    return datetime.strptime(processing_time, "%d %b %Y %H:%M %Z").replace(
+        tzinfo=timezone.utc
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_literal(value):
+    """
+    Parse a Python literal given as string in the config, e.g. the L2 variables.
+
+    The config values are the same for all sondes, so the parsed values are cached.
+    The returned objects are shared and must not be modified.
+    """
+    return ast.literal_eval(value)
+
+
+@functools.lru_cache(maxsize=256)
+def _attr_var_name(attr):
+    """
+    Return the variable name of an L2 attribute like ``aircraft_latitude (deg N)``.
+
+    All sondes of a campaign share the same attribute names, so the parsed
+    names are cached.
+    """
+    return attr.split("(")[0][:-1]
+
+
+# defaults of Sonde.init_qc and Sonde.get_qc, shared by all sondes and not to be modified
+_default_qc_vars = {"u": "m s-1", "v": "m s-1", "rh": "1", "ta": "K", "p": "Pa"}
+_default_run_qc = (
+    "profile_sparsity",
+    "profile_extent",
+    "near_surface_coverage",
+    "alt_near_gpsalt",
+    "sfc_physics",
+)
+
+_aspen_image = "ghcr.io/atmdrops/aspenqc:4.0.2"
+
+
+_aspen_entrypoints = {}
+
+
+def _aspen_entrypoint():
+    """
+    Return the entrypoint of the ASPEN docker image, or None if it cannot be inspected.
+
+    Only successful lookups are cached, so that e.g. an image that is pulled later
+    is inspected again.
+    """
+    if _aspen_image in _aspen_entrypoints:
+        return _aspen_entrypoints[_aspen_image]
+    try:
+        result = subprocess.run(
+            [
+                "docker",
+                "image",
+                "inspect",
+                "--format",
+                "{{json .Config.Entrypoint}}",
+                _aspen_image,
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        warnings.warn(
+            f"Could not inspect the docker image {_aspen_image}, running ASPEN in one container per file"
+        )
+        return None
+    entrypoint = json.loads(result.stdout) or None
+    _aspen_entrypoints[_aspen_image] = entrypoint
+    return entrypoint
+
+
+def _aspen_commands(l0_dir, l1_dir, is_minisonde, files):
+    """
+    Return the docker commands running ASPEN on `files`, a list of (L0 name, L1 name) tuples.
+
+    All files of one directory are processed in a single container if the entrypoint of
+    the ASPEN image is known, otherwise one container is started per file. The single
+    container runs a shell script, which assumes that the image provides `sh`. Every file
+    is processed even if ASPEN fails on one of them; the script then exits with an error.
+    """
+    docker_run = [
+        "docker",
+        "run",
+        "--rm",
+        "--mount",
+        f"type=bind,source={l0_dir},target=/input",
+        "--mount",
+        f"type=bind,source={l1_dir},target=/output",
+    ]
+    options = ["-1", "mini-dropsonde"] if is_minisonde else []
+    entrypoint = _aspen_entrypoint() if len(files) > 1 else None
+    if entrypoint is None:
+        return [
+            docker_run
+            + [_aspen_image, "-i", f"/input/{dname}", "-n", f"/output/{l1_name}"]
+            + options
+            for dname, l1_name in files
+        ]
+    # a failing file does not stop the remaining ones, but the container still fails
+    script = "; ".join(
+        ["status=0"]
+        + [
+            shlex.join(
+                entrypoint
+                + ["-i", f"/input/{dname}", "-n", f"/output/{l1_name}"]
+                + options
+            )
+            + " || status=1"
+            for dname, l1_name in files
+        ]
+        + ["exit $status"]
+    )
+    return [docker_run + ["--entrypoint", "sh", _aspen_image, "-c", script]]
+
+
+def run_aspen_jobs(jobs: list, max_workers: int = None) -> None:
+    """
+    Runs ASPEN for a list of jobs as returned by `Sonde.prepare_aspen_job`.
+
+    The jobs are grouped by directory, so that one docker container processes all files
+    of a directory instead of starting a container per sonde. Groups run in parallel threads.
+
+    Parameters
+    ----------
+    jobs : list
+        A list of (l0_dir, l1_dir, is_minisonde, L0 name, L1 name) tuples. None entries are ignored.
+    max_workers : int, optional
+        The maximum number of concurrent docker containers. Defaults to the ThreadPoolExecutor default.
+    """
+    groups = {}
+    for job in jobs:
+        if job is not None:
+            groups.setdefault(job[:3], []).append(job[3:])
+    commands = [
+        command
+        for (l0_dir, l1_dir, is_minisonde), files in groups.items()
+        for command in _aspen_commands(l0_dir, l1_dir, is_minisonde, files)
+    ]
+    with ThreadPoolExecutor(
+        max_workers=int(max_workers) if max_workers is not None else None
+    ) as executor:
+        list(executor.map(functools.partial(subprocess.run, check=True), commands))
+    for l1_dir in {l1_dir for _, l1_dir, _ in groups}:
+        _invalidate_dir(l1_dir)
+
+
+@dataclass(order=True, slots=True)
 class Sonde:
     """Class identifying a sonde and containing its metadata
 
@@ -38,12 +241,46 @@ class Sonde:
     - other information such as reconditioning status, signal strength, etc.
     """
 
-    sort_index: np.datetime64 = field(init=False, repr=False)
+    sort_index: int = field(init=False, repr=False)
     _serial_id: str
     cont: bool = True
     _: KW_ONLY
     _launch_time: Optional[Any] = None
     sonde_rev: Optional[str] = None
+    # attributes set while processing the sonde
+    _flight_id: str = field(init=False, repr=False, compare=False)
+    _platform_id: str = field(init=False, repr=False, compare=False)
+    _aspen_ds: xr.Dataset = field(init=False, repr=False, compare=False)
+    _l2_ds: xr.Dataset = field(init=False, repr=False, compare=False)
+    _interim_l2_ds: Optional[xr.Dataset] = field(init=False, repr=False, compare=False)
+    qc: QualityControl = field(init=False, repr=False, compare=False)
+    sonde_dim: str = field(init=False, repr=False, compare=False)
+    launch_alt: float = field(init=False, repr=False, compare=False)
+    launch_lat: float = field(init=False, repr=False, compare=False)
+    launch_lon: float = field(init=False, repr=False, compare=False)
+    launch_detect: Any = field(init=False, repr=False, compare=False)
+    afile: str = field(init=False, repr=False, compare=False)
+    _dname: str = field(init=False, repr=False, compare=False)
+    _l1_name: str = field(init=False, repr=False, compare=False)
+    _default_postaspenfile: str = field(init=False, repr=False, compare=False)
+    l0_dir: str = field(init=False, repr=False, compare=False)
+    l1_dir: str = field(init=False, repr=False, compare=False)
+    l2_dir: str = field(init=False, repr=False, compare=False)
+    broken_sondes: dict = field(init=False, repr=False, compare=False)
+    postaspenfile: str = field(init=False, repr=False, compare=False)
+    history: str = field(init=False, repr=False, compare=False)
+    landing_time: Any = field(init=False, repr=False, compare=False)
+    cropped_aspen_ds: xr.Dataset = field(init=False, repr=False, compare=False)
+    flight_attrs: dict = field(init=False, repr=False, compare=False)
+    sonde_attrs: dict = field(init=False, repr=False, compare=False)
+    global_attrs: dict = field(init=False, repr=False, compare=False)
+    l2_filename: str = field(init=False, repr=False, compare=False)
+    interim_l3_ds: xr.Dataset = field(init=False, repr=False, compare=False)
+    interim_l3_dir: str = field(init=False, repr=False, compare=False)
+    interim_l3_filename: str = field(init=False, repr=False, compare=False)
+    alt_dim: str = field(init=False, repr=False, compare=False)
+    count_dict: dict = field(init=False, repr=False, compare=False)
+    attrs: Any = field(init=False, repr=False, compare=False)
 
     @property
     def flight_id(self):
@@ -81,6 +318,22 @@ class Sonde:
     def set_l2_ds(self, ds):
         self._l2_ds = ds
 
+    @property
+    def interim_l2_ds(self):
+        return self._interim_l2_ds
+
+    @interim_l2_ds.setter
+    def interim_l2_ds(self, ds):
+        self._interim_l2_ds = ds
+
+    def _current_ds(self):
+        """
+        Returns the interim L2 dataset if it has been created, else the dataset read from the post-ASPEN file.
+        """
+        if self._interim_l2_ds is not None:
+            return self._interim_l2_ds
+        return self.aspen_ds
+
     @property
     def is_minisonde(self):
         return self.sonde_rev == "N1"
@@ -89,11 +342,19 @@ class Sonde:
         """
         Initializes the 'qc' attribute as an empty object and sets the 'sort_index' attribute based on 'launch_time'.
 
-        The 'sort_index' attribute is only applicable when 'launch_time' is available. If 'launch_time' is None, 'sort_index' will not be set.
+        The 'sort_index' attribute is only applicable when 'launch_time' is available. If 'launch_time' is None
+        or cannot be parsed as a datetime (e.g. "UNKNOWN" for A-files without launch information), 'sort_index' will not be set.
         """
         self.qc = QualityControl()
+        self._interim_l2_ds = None
         if self.launch_time is not None:
-            self.sort_index = self.launch_time
+            try:
+                # compare sondes by plain integers (ns since epoch) instead of datetime64 scalars
+                self.sort_index = int(
+                    np.datetime64(self.launch_time, "ns").astype(np.int64)
+                )
+            except ValueError:
+                pass
         self.sonde_dim = "sonde"
 
     def add_flight_id(self, flight_id: str, flight_template: str = None) -> None:
@@ -159,6 +420,11 @@ class Sonde:
             Path to the sonde's A-file
         """
         self.afile = path_to_afile
+        # names of the L0 and post-ASPEN files only depend on the A-file, so derive them once
+        self._dname = "D" + os.path.basename(path_to_afile)[1:]
+        self._l1_name = self._dname.split(".")[0] + "QC.nc"
+        if hasattr(self, "l1_dir"):
+            self._default_postaspenfile = os.path.join(self.l1_dir, self._l1_name)
         return self
 
     def add_level_dir(self, l0_dir: str = None, l1_dir: str = None, l2_dir: str = None):
@@ -197,6 +463,8 @@ class Sonde:
         self.l0_dir = l0_dir
         self.l1_dir = l1_dir
         self.l2_dir = l2_dir
+        if hasattr(self, "_l1_name"):
+            self._default_postaspenfile = os.path.join(l1_dir, self._l1_name)
 
     def add_broken(self, broken_sondes: dict):
         """
@@ -212,6 +480,51 @@ class Sonde:
         """
         self.broken_sondes = broken_sondes
 
+    def prepare_aspen_job(self, path_to_postaspenfile: str = None) -> Optional[tuple]:
+        """Sets attribute with path to post-ASPEN file of the sonde and returns the ASPEN job needed to create it
+
+        The post-ASPEN file path is constructed as in `run_aspen`. If the file doesn't exist yet,
+        the job to run ASPEN on the L0 file is returned, which can be run with `run_aspen_jobs`.
+
+        Parameters
+        ----------
+        path_to_postaspenfile : str, optional
+            The path to the post-ASPEN file. If not provided, the function will attempt to construct the path from the `afile` attribute.
+
+        Returns
+        -------
+        tuple or None
+            (l0_dir, l1_dir, is_minisonde, L0 name, L1 name) if ASPEN needs to be run, else None.
+        """
+
+        l0_dir = self.l0_dir  # os.path.dirname(self.afile)
+        dname = self._dname
+        l1_dir = self.l1_dir
+        l1_name = self._l1_name
+
+        if path_to_postaspenfile is None:
+            path_to_postaspenfile = self._default_postaspenfile
+        self.postaspenfile = path_to_postaspenfile
+
+        postaspen_dir, postaspen_name = os.path.split(path_to_postaspenfile)
+        if postaspen_name in _scan_dir(postaspen_dir or os.curdir):
+            return None
+        l0_entry = _scan_dir(l0_dir).get(dname)
+        if l0_entry is None:
+            raise FileNotFoundError(
+                f"No L0 file {dname} found in {l0_dir} for sonde {self.serial_id}"
+            )
+        if l0_entry.stat().st_size == 0:
+            warnings.warn(
+                f"L0 file for sonde {self.serial_id} on {self.flight_id} is empty. No processing done"
+            )
+            return None
+        if (l1_dir not in _dir_cache) or (l1_dir in _missing_dirs):
+            # a cached listing of an existing directory means it need not be created
+            os.makedirs(l1_dir, exist_ok=True)
+            _missing_dirs.discard(l1_dir)
+        return (l0_dir, l1_dir, self.is_minisonde, dname, l1_name)
+
     def run_aspen(self, path_to_postaspenfile: str = None) -> None:
         """Runs aspen and sets attribute with path to post-ASPEN file of the sonde
 
@@ -233,61 +546,33 @@ class Sonde:
         postaspenfile : str
             The path to the post-ASPEN file. This attribute is set if the file exists at the constructed or provided path.
         """
-
-        l0_dir = self.l0_dir  # os.path.dirname(self.afile)
-        aname = os.path.basename(self.afile)
-        dname = "D" + aname[1:]
-        l1_dir = self.l1_dir
-        l1_name = dname.split(".")[0] + "QC.nc"
-
-        if path_to_postaspenfile is None:
-            path_to_postaspenfile = os.path.join(l1_dir, l1_name)
-
-        if not os.path.exists(path_to_postaspenfile):
-            if os.path.getsize(os.path.join(l0_dir, dname)) > 0:
-                os.makedirs(l1_dir, exist_ok=True)
-
-                command = [
-                    "docker",
-                    "run",
-                    "--rm",
-                    "--mount",
-                    f"type=bind,source={l0_dir},target=/input",
-                    "--mount",
-                    f"type=bind,source={l1_dir},target=/output",
-                    "ghcr.io/atmdrops/aspenqc:4.0.2",
-                    "-i",
-                    f"/input/{dname}",
-                    "-n",
-                    f"/output/{l1_name}",
-                ]
-
-                if self.is_minisonde:
-                    command += ["-1", "mini-dropsonde"]
-
-                subprocess.run(
-                    command,
-                    check=True,
-                )
-            else:
-                warnings.warn(
-                    f"L0 file for sonde {self.serial_id} on {self.flight_id} is empty. No processing done"
-                )
-        self.postaspenfile = path_to_postaspenfile
+        run_aspen_jobs([self.prepare_aspen_job(path_to_postaspenfile)])
         return self
 
-    def add_aspen_ds(self) -> None:
+    def add_aspen_ds(self, engine: str = "netcdf4") -> None:
         """Sets attribute with an xarray Dataset read from post-ASPEN file
 
         The function will first check if the serial ID of the instance and that obtained from the
         global attributes of the post-ASPEN file match. If they don't, function will print out an error.
 
         If the `postaspenfile` attribute doesn't exist, function will print out an error
+
+        Parameters
+        ----------
+        engine : str, optional
+            The xarray backend used to open the post-ASPEN file. Default is 'netcdf4'.
+            If h5netcdf is installed, 'h5netcdf' can be used instead. Engines that are
+            not installed fall back to 'netcdf4' with a warning.
         """
+        if engine not in xr.backends.list_engines():
+            # an unknown engine raises a ValueError in open_dataset, which would
+            # otherwise be reported as an invalid L1 file for every sonde
+            warnings.warn(f"xarray engine {engine} is not available, using netcdf4")
+            engine = "netcdf4"
 
         if hasattr(self, "postaspenfile"):
             try:
-                ds = xr.open_dataset(self.postaspenfile, engine="netcdf4")
+                ds = xr.open_dataset(self.postaspenfile, engine=engine)
             except ValueError:
                 warnings.warn(f"No valid l1 file for sonde {self.serial_id}")
                 return None
@@ -345,9 +630,7 @@ class Sonde:
             aspen_version = self.aspen_ds.AvapsEditorVersion
         assert self.aspen_ds.ProcessingTime[-3:] == "UTC"
 
-        aspen_time = datetime.strptime(
-            self.aspen_ds.ProcessingTime, "%d %b %Y %H:%M %Z"
-        ).replace(tzinfo=timezone.utc)
+        aspen_time = _parse_aspen_time(self.aspen_ds.ProcessingTime)
 
         history = (
             history
@@ -501,7 +784,7 @@ class Sonde:
         """
 
         if qc_vars is None:
-            qc_vars = {"u": "m s-1", "v": "m s-1", "rh": "1", "ta": "K", "p": "Pa"}
+            qc_vars = _default_qc_vars
         self.qc.set_qc_variables(qc_vars)
         self.qc.set_qc_ds(self.aspen_ds)
         return self
@@ -516,17 +799,12 @@ class Sonde:
             contains qc functions in the QualityControl class that should be run on the qc_variables. Can be a list of strings or a string with comma-separated variable names
         """
         if run_qc is None:
-            run_qc = [
-                "profile_sparsity",
-                "profile_extent",
-                "near_surface_coverage",
-                "alt_near_gpsalt",
-                "sfc_physics",
-            ]
+            run_qc = _default_run_qc
         elif isinstance(run_qc, str):
             run_qc = run_qc.split(",")
+        qc = self.qc
         for fct in run_qc:
-            qc_fct = getattr(self.qc, fct)
+            qc_fct = getattr(qc, fct)
             qc_fct()
         return self
 
@@ -569,6 +847,7 @@ class Sonde:
         skip : bool, optional
             If set to True, the function will skip the conversion process but will still ensure that the 'interim_l2_ds' attribute is set.
             If 'interim_l2_ds' is not already an attribute of the object, it will be set to 'aspen_ds'.
+            In that case 'interim_l2_ds' shares its data with 'aspen_ds' until it is subsetted or modified.
             Default is False.
 
         Returns
@@ -578,25 +857,33 @@ class Sonde:
             If 'skip' is set to True, it returns the sonde object with 'interim_l2_ds' set to 'aspen_ds' if it wasn't already present.
         """
         if hh.get_bool(skip):
-            if hasattr(self, "interim_l2_ds"):
+            if self._interim_l2_ds is not None:
                 return self
             else:
-                self.interim_l2_ds = self.aspen_ds.copy()
+                # no copy needed: later steps build new datasets instead of
+                # modifying interim_l2_ds in place
+                self.interim_l2_ds = self.aspen_ds
                 return self
         else:
             if isinstance(variables, str):
                 variables = variables.split(",")
 
-            if hasattr(self, "interim_l2_ds"):
-                ds = self.interim_l2_ds
-            else:
-                ds = self.aspen_ds
+            ds = self._current_ds()
 
-            for variable in variables:
-                func = hh.get_si_converter_function_based_on_var(variable)
-                var_attrs = ds[variable].attrs
-                ds = ds.assign({f"{variable}": func(ds[variable])})
-                ds[variable].attrs.update(var_attrs)
+            # convert the underlying (numpy or dask) arrays directly instead of
+            # going through DataArray arithmetic
+            ds = ds.assign(
+                {
+                    variable: xr.Variable(
+                        ds[variable].dims,
+                        hh.get_si_converter_function_based_on_var(variable)(
+                            ds[variable].data
+                        ),
+                        ds[variable].attrs,
+                    )
+                    for variable in variables
+                }
+            )
             self.interim_l2_ds = ds
 
             return self
@@ -620,27 +907,31 @@ class Sonde:
             If 'interim_l2_ds' is not already an attribute of the object, it will first be set to 'aspen_ds' before reducing to the variables and renaming.
         """
         if isinstance(l2_variables, str):
-            l2_variables = ast.literal_eval(l2_variables)
+            l2_variables = _parse_literal(l2_variables)
 
         l2_variables_list = list(l2_variables.keys())
 
-        if hasattr(self, "interim_l2_ds"):
-            ds = self.interim_l2_ds
-        else:
-            ds = self.aspen_ds
+        ds = self._current_ds()
 
         ds = ds[l2_variables_list]
 
         for variable, variable_dict in l2_variables.items():
             if "attributes" in variable_dict:
                 ds[variable].attrs = variable_dict["attributes"]
-            ds = ds.rename({variable: variable_dict["rename_to"]})
+        ds = ds.rename(
+            {
+                variable: variable_dict["rename_to"]
+                for variable, variable_dict in l2_variables.items()
+                if "rename_to" in variable_dict
+            }
+        )
         self.interim_l2_ds = ds
 
         return self
 
     def get_flight_attributes(
-        self, l2_flight_attributes_map: dict = hh.l2_flight_attributes_map
+        self,
+        l2_flight_attributes_map: dict = hh.l2_flight_attributes_map,
     ) -> None:
         """
         Gets flight attributes from the A-file and adds them to the sonde object.
@@ -657,25 +948,33 @@ class Sonde:
         self : object
             Returns the sonde object with the flight attributes added as attributes.
         """
-        flight_attrs = {}
-
         with open(self.afile, "r") as f:
-            lines = f.readlines()
-
-        for attr in l2_flight_attributes_map.keys():
-            for line_id, line in enumerate(lines):
-                if attr in line:
-                    break
+            afile_content = f.read()
+
+        # search each attribute in the whole content with str.find instead of
+        # testing every attribute against every line
+        values = {}
+        for attr in l2_flight_attributes_map:
+            index = afile_content.find(attr)
+            if index == -1:
+                continue
+            line_start = afile_content.rfind("\n", 0, index) + 1
+            line_end = afile_content.find("\n", index)
+            line_end = len(afile_content) if line_end == -1 else line_end + 1
+            values[attr] = afile_content[line_start:line_end].split("= ")[1]
+
+        if not values:
+            print(
+                f"No flight attributes for sonde {self.serial_id} on {self.flight_id}"
+            )
 
-            attr = l2_flight_attributes_map.get(attr, attr)
-            try:
-                value = lines[line_id].split("= ")[1]
-                flight_attrs[attr] = float(value) if "AVAPS" not in attr else value
-            except UnboundLocalError:
-                print(
-                    f"No flight attributes for sonde {self.serial_id} on {self.flight_id}"
+        flight_attrs = {}
+        for attr, attr_name in l2_flight_attributes_map.items():
+            if attr in values:
+                value = values[attr]
+                flight_attrs[attr_name] = (
+                    float(value) if "AVAPS" not in attr_name else value
                 )
-                break
         self.flight_attrs = flight_attrs
 
         return self
@@ -720,6 +1019,65 @@ class Sonde:
 
         return self
 
+    def add_id_variables(
+        self,
+        sonde_id_name="sonde_id",
+        platform_id_name="platform_id",
+        flight_id_name="flight_id",
+    ):
+        """
+        Adds the sonde, platform and flight ID variables and related attributes to the sonde object in one step.
+
+        Parameters
+        ----------
+        sonde_id_name : str, optional
+            The name of the variable containing serial_id. Default is 'sonde_id'. If None, the variable is not added.
+        platform_id_name : str, optional
+            The name of the variable containing platform_id. Default is 'platform_id'. If None, the variable is not added.
+        flight_id_name : str, optional
+            The name of the variable containing flight_id. Default is 'flight_id'. If None, the variable is not added.
+
+        Returns
+        -------
+        self : object
+            Returns the sonde object with variables containing serial_id, platform_id and flight_id.
+        """
+        id_variables = {
+            sonde_id_name: (
+                self.serial_id,
+                {
+                    "descripion": "unique sonde ID",
+                    "long_name": "sonde identifier",
+                    "cf_role": "trajectory_id",
+                },
+            ),
+            platform_id_name: (
+                self.platform_id,
+                dict(
+                    description="unique platform ID",
+                    long_name="platform identifier",
+                ),
+            ),
+            flight_id_name: (
+                self.flight_id,
+                dict(
+                    description="unique flight ID",
+                    long_name="flight identifier",
+                ),
+            ),
+        }
+        id_variables.pop(None, None)
+
+        ds = self._current_ds()
+        ds = ds.assign(
+            {
+                name: xr.DataArray(value, attrs=attrs)
+                for name, (value, attrs) in id_variables.items()
+            }
+        )
+        self.interim_l2_ds = ds
+        return self
+
     def add_sonde_id_variable(self, variable_name="sonde_id"):
         """
         Adds a variable and related attributes to the sonde object with the Sonde object (self)'s serial_id attribute.
@@ -734,20 +1092,9 @@ class Sonde:
         self : object
             Returns the sonde object with a variable containing serial_id. Name of the variable provided by 'variable_name'.
         """
-        if hasattr(self, "interim_l2_ds"):
-            ds = self.interim_l2_ds
-        else:
-            ds = self.aspen_ds
-        attrs = {
-            "descripion": "unique sonde ID",
-            "long_name": "sonde identifier",
-            "cf_role": "trajectory_id",
-        }
-        ds = ds.assign({variable_name: self.serial_id})
-        ds[variable_name] = ds[variable_name].assign_attrs(attrs)
-        self.interim_l2_ds = ds
-
-        return self
+        return self.add_id_variables(
+            sonde_id_name=variable_name, platform_id_name=None, flight_id_name=None
+        )
 
     def add_platform_id_variable(self, variable_name="platform_id"):
         """
@@ -763,19 +1110,9 @@ class Sonde:
         self : object
             Returns the sonde object with a variable containing platform_id. Name of the variable provided by 'variable_name'.
         """
-        if hasattr(self, "interim_l2_ds"):
-            ds = self.interim_l2_ds
-        else:
-            ds = self.aspen_ds
-
-        attrs = dict(
-            description="unique platform ID",
-            long_name="platform identifier",
+        return self.add_id_variables(
+            sonde_id_name=None, platform_id_name=variable_name, flight_id_name=None
         )
-        ds = ds.assign({variable_name: self.platform_id})
-        ds[variable_name] = ds[variable_name].assign_attrs(attrs)
-        self.interim_l2_ds = ds
-        return self
 
     def add_flight_id_variable(self, variable_name="flight_id"):
         """
@@ -791,21 +1128,10 @@ class Sonde:
         self : object
             Returns the sonde object with a variable containing flight_id. Name of the variable provided by 'variable_name'.
         """
-        if hasattr(self, "interim_l2_ds"):
-            ds = self.interim_l2_ds
-        else:
-            ds = self.aspen_ds
-
-        attrs = dict(
-            description="unique flight ID",
-            long_name="flight identifier",
+        return self.add_id_variables(
+            sonde_id_name=None, platform_id_name=None, flight_id_name=variable_name
         )
 
-        ds = ds.assign({variable_name: self.flight_id})
-        ds[variable_name] = ds[variable_name].assign_attrs(attrs)
-        self.interim_l2_ds = ds
-        return self
-
     def update_history_l2(self):
         history = getattr(self, "history", "")
         history = (
@@ -829,20 +1155,16 @@ class Sonde:
         self : object
             Returns the sonde object with flight, sonde and global attributes added to interim_l2_ds.
         """
-        ds = self.interim_l2_ds
-
-        attrs_to_del = []
-        for attr in ds.attrs.keys():
-            attrs_to_del.append(attr)
-
-        for attr in attrs_to_del:
-            del ds.attrs[attr]
-
+        attrs = {}
         if hasattr(self, "flight_attrs"):
-            ds = ds.assign_attrs(self.flight_attrs)
+            attrs.update(self.flight_attrs)
         if hasattr(self, "sonde_attrs"):
-            ds = ds.assign_attrs(self.sonde_attrs)
+            attrs.update(self.sonde_attrs)
 
+        # shallow copy, so that the attributes of a dataset sharing the attrs
+        # (e.g. aspen_ds) are not cleared as well
+        ds = self.interim_l2_ds.copy(deep=False)
+        ds.attrs = attrs
         self.interim_l2_ds = ds
 
         return self
@@ -869,13 +1191,14 @@ class Sonde:
         - self: The instance of the class with the updated dataset.
 
         """
+        qc = self.qc
         ds = self.interim_l2_ds
         if add_var_qc:
-            for variable in self.qc.qc_vars:
-                ds = self.qc.add_variable_flags_to_ds(ds, variable, details=add_details)
+            for variable in qc.qc_vars:
+                ds = qc.add_variable_flags_to_ds(ds, variable, details=add_details)
 
-            ds = self.qc.add_non_var_qc_to_ds(ds)
-        ds = self.qc.add_sonde_flag_to_ds(ds, "sonde_qc")
+            ds = qc.add_non_var_qc_to_ds(ds)
+        ds = qc.add_sonde_flag_to_ds(ds, "sonde_qc")
         self.interim_l2_ds = ds
         return self
 
@@ -897,30 +1220,30 @@ class Sonde:
         """
 
         if l2_filename is None:
-            if l2_filename_template:
-                l2_filename = l2_filename_template.format(
-                    platform=self.platform_id,
-                    serial_id=self.serial_id,
-                    flight_id=self.flight_id,
-                )
-            else:
-                l2_filename = hh.l2_filename_template.format(
-                    platform=self.platform_id,
-                    serial_id=self.serial_id,
-                    flight_id=self.flight_id,
-                )
+            l2_filename = (l2_filename_template or hh.l2_filename_template).format_map(
+                {
+                    "platform": self.platform_id,
+                    "serial_id": self.serial_id,
+                    "flight_id": self.flight_id,
+                }
+            )
         self.l2_filename = l2_filename
 
         return self
 
-    def write_l2(self, l2_dir: str = None):
+    def write_l2(self, l2_dir: str = None, complevel: int = None):
         """
         Writes the L2 file to the specified directory.
 
+        The variables are written zlib compressed in one chunk along time, matching
+        the access pattern of reading whole profiles in the following processing steps.
+
         Parameters
         ----------
         l2_dir : str, optional
             The directory to write the L2 file to. The default is the directory of the A-file with '0' replaced by '2'.
+        complevel : int, optional
+            The zlib compression level (1-9) of the variables. The default is the netCDF default (4).
 
         Returns
         -------
@@ -939,25 +1262,22 @@ class Sonde:
                 )
 
         ds.attrs.update(
-            self.global_attrs["global"],
-        )
-        ds.attrs.update(
-            self.global_attrs["l2"],
-        )
-        ds.attrs.update(
-            dict(
-                history=self.history,
-                title=self.global_attrs["l2"].get(
+            {
+                **self.global_attrs["global"],
+                **self.global_attrs["l2"],
+                "history": self.history,
+                "title": self.global_attrs["l2"].get(
                     "title",
                     self.global_attrs.get("title", "Dropsonde Data") + " Level_2",
                 )
                 + f", {self.serial_id}",
-            )
+            }
         )
         hx.write_ds(
             ds=ds,
             dir=l2_dir,
             filename=self.l2_filename,
+            complevel=complevel,
             object_dims=(self.sonde_dim,),
             alt_dim="time",
         )
@@ -1035,16 +1355,12 @@ class Sonde:
             )
         self.interim_l3_dir = interim_l3_dir
         self.interim_l3_filename = interim_l3_filename
-        if (not skip) and os.path.exists(
-            os.path.join(interim_l3_dir, interim_l3_filename)
-        ):
-            self.interim_l3_ds = hx.open_dataset(
-                os.path.join(interim_l3_dir, interim_l3_filename)
-            )
-            self.cont = False
-            return self
-        else:
-            return self
+        if not skip:
+            interim_l3_path = os.path.join(interim_l3_dir, interim_l3_filename)
+            if os.path.exists(interim_l3_path):
+                self.interim_l3_ds = hx.open_dataset(interim_l3_path)
+                self.cont = False
+        return self
 
     def remove_above_aircraft(self, max_alt=15000):
         """
@@ -1206,47 +1522,67 @@ class Sonde:
         - self: Returns the object itself if the altitude dimension is successfully replaced or remains valid.
         - None: Returns None if the dataset is dropped due to NaN altitude values.
         """
+        qc = self.qc
         alt_dim = self.alt_dim
         ds = self.interim_l2_ds
         alt_attrs = ds[alt_dim].attrs
-        if (not self.qc.qc_flags["p_sfc_physics"]) and (np.all(np.isnan(ds["gpsalt"]))):
+        if (not qc.qc_flags["p_sfc_physics"]) and bn.allnan(ds["gpsalt"].values):
             print(
                 f"No gpsalt values and no reliable alt values.  Sonde {self.serial_id} from {self.flight_id} is dropped"
             )
             return None
         elif alt_dim == "alt":
-            self.qc.qc_flags.update({"altitude_source": "alt"})
-            if not self.qc.qc_flags["p_sfc_physics"]:
+            altitude_source = "alt"
+            if not qc.qc_flags["p_sfc_physics"]:
                 for var in ["rh", "ta", "p"]:
-                    self.qc.qc_flags[f"{var}_near_surface"] = False
-                    self.qc.qc_details[f"{var}_near_surface_count"] = np.nan
-
-                ds = ds.assign({"alt": ds["gpsalt"]})
-                self.qc.qc_flags.update({"altitude_source": "gpsalt"})
-            ds = ds.rename({"alt": "altitude"}).drop_vars(["gpsalt"])
-
+                    qc.qc_flags[f"{var}_near_surface"] = False
+                    qc.qc_details[f"{var}_near_surface_count"] = np.nan
+                altitude_source = "gpsalt"
         elif alt_dim == "gpsalt":
-            self.qc.qc_flags.update({"altitude_source": "gpsalt"})
-            if (not self.qc.qc_flags["u_near_surface"]) and (
-                self.qc.qc_flags["p_sfc_physics"]
-            ):
-                ds = ds.assign({alt_dim: ds["alt"]})
-                self.qc.qc_flags.update({"altitude_source": "alt"})
-            elif not self.qc.qc_flags["p_sfc_physics"]:
+            altitude_source = "gpsalt"
+            if (not qc.qc_flags["u_near_surface"]) and (qc.qc_flags["p_sfc_physics"]):
+                altitude_source = "alt"
+            elif not qc.qc_flags["p_sfc_physics"]:
                 for var in ["rh", "ta", "p"]:
-                    self.qc.qc_flags[f"{var}_near_surface"] = False
-                    self.qc.qc_details[f"{var}_near_surface_count"] = np.nan
-            ds = ds.rename({"gpsalt": "altitude"}).drop_vars(["alt"])
+                    qc.qc_flags[f"{var}_near_surface"] = False
+                    qc.qc_details[f"{var}_near_surface_count"] = np.nan
         else:
-            self.qc.qc_flags.update({"altitude_source": self.alt_dim})
+            altitude_source = self.alt_dim
+        qc.qc_flags.update({"altitude_source": altitude_source})
+        if alt_dim in ["alt", "gpsalt"]:
+            # keep the chosen altitude variable and drop the other one
+            ds = ds.drop_vars(
+                [var for var in ["alt", "gpsalt"] if var != altitude_source]
+            ).rename({altitude_source: "altitude"})
         if hh.get_bool(interpolate):
-            ds = ds.assign(
-                {"altitude": ds["altitude"].sortby("time").interpolate_na(dim="time")}
-            )
+            time = ds["time"].values
+            # interpolate on the raw arrays if the time is already sorted, with the
+            # same nanosecond coordinate as interpolate_na
+            time_ns = time.astype("datetime64[ns]").astype(np.int64).astype(float)
+            if (
+                ds["altitude"].dims == ("time",)
+                and not np.isnat(time).any()
+                and np.all(np.diff(time_ns) > 0)
+            ):
+                ds = ds.assign(
+                    altitude=(
+                        "time",
+                        _interpolate_max_gap(ds["altitude"].values, time_ns, np.inf),
+                        ds["altitude"].attrs,
+                    )
+                )
+            else:
+                ds = ds.assign(
+                    {
+                        "altitude": ds["altitude"]
+                        .sortby("time")
+                        .interpolate_na(dim="time")
+                    }
+                )
         ds.altitude.attrs.update(alt_attrs)
         self.interim_l2_ds = ds
         self.alt_dim = "altitude"
-        self.qc.alt_dim = "altitude"
+        qc.alt_dim = "altitude"
         return self
 
     def swap_alt_dimension(self):
@@ -1254,9 +1590,9 @@ class Sonde:
         Swap the 'time' dimension with an alternative dimension (either alt or gpsalt) in the dataset.
 
         This method swaps the 'time' dimension of the dataset with an alternative
-        dimension specified by the `alt_dim` attribute of the object. It then loads
-        the dataset with the new dimension configuration and updates the object's
-        internal dataset attribute `interim_l3_ds`.
+        dimension specified by the `alt_dim` attribute of the object and updates the
+        object's internal dataset attribute `interim_l3_ds`. The data is not loaded,
+        so lazily read variables stay lazy.
 
         Returns:
             self: The instance of the object with the updated dataset.
@@ -1274,39 +1610,32 @@ class Sonde:
 
         ds = self.interim_l3_ds
 
-        diff_array = ds[alt_dim].sortby("time").dropna(dim="time").diff(dim="time")
+        # check on the plain arrays first, most sondes need no correction
+        alt_sorted = ds[alt_dim].values[np.argsort(ds["time"].values, kind="stable")]
+        diff_array = np.diff(alt_sorted[~np.isnan(alt_sorted)])
         if not np.all(diff_array < 0):
             warnings.warn(
                 f"your altitude for sonde {self.serial_id
                 } on {self.launch_time} is not sorted."
             )
             if bottom_up:
-                alt = ds[alt_dim].sortby("time", ascending=False).values
-                idx = (
-                    diff_array.sortby("time", ascending=False)
-                    .where(diff_array > 0)
-                    .argmin(dim="time")
-                    .values
-                )
-                curr_alt = alt[idx]
-                idx = idx + 1
-                while idx < ds.sizes["time"]:
-                    if alt[idx] < curr_alt:
-                        alt[idx] = np.nan
-                    elif ~np.isnan(alt[idx]):
-                        curr_alt = alt[idx]
-                    idx += 1
+                # reversing the time-sorted arrays gives the descending time order
+                alt = alt_sorted[::-1]
+                rev_diff = diff_array[::-1]
+                idx = np.nanargmin(np.where(rev_diff > 0, rev_diff, np.nan))
+                # remove values below the running maximum after idx,
+                # fmax ignores NaNs so no filled copy of the profile is needed
+                above = alt[idx + 1 :]
+                running_max = np.fmax(np.fmax.accumulate(above), alt[idx])
+                above[above < running_max] = np.nan
                 ds = ds.assign({alt_dim: ("time", alt[::-1], ds[alt_dim].attrs)})
 
             else:
-                alt = ds[alt_dim]
-                curr_alt = alt.isel(time=0)
-                for i in range(len(alt)):
-                    if alt[i] > curr_alt:
-                        alt[i] = np.nan
-                    elif ~np.isnan(alt[i]):
-                        curr_alt = alt[i]
-                ds[alt_dim] = alt
+                # remove values above the running minimum, ignoring NaNs
+                alt = ds[alt_dim].values.copy()
+                running_min = np.fmin.accumulate(alt)
+                alt[alt > running_min] = np.nan
+                ds = ds.assign({alt_dim: (ds[alt_dim].dims, alt, ds[alt_dim].attrs)})
 
         self.interim_l3_ds = ds
 
@@ -1329,64 +1658,78 @@ class Sonde:
         interpolation_grid = np.arange(interp_start, interp_stop, interp_step)
         ds = self.interim_l3_ds
 
-        if p_log:
-            ds = ds.assign(p=(ds.p.dims, np.log(ds.p.values), ds.p.attrs))
         if method == "linear_interpolate":
+            if p_log:
+                ds = ds.assign(p=(ds.p.dims, np.log(ds.p.values), ds.p.attrs))
             interp_ds = ds.interp({alt_dim: interpolation_grid})
         elif method == "bin":
+            bin_dim = f"{alt_dim}_bin"
+            variables = [
+                var
+                for var in [
+                    "u",
+                    "v",
+                    "q",
+                    "p",
+                    "theta",
+                    "lat",
+                    "lon",
+                    "gpsalt",
+                    "time",
+                    "alt",
+                ]
+                if (var in ds.variables) and (var not in ds.dims)
+            ]
+            nbins = interpolation_grid.size - 1
+            bin_centers = 0.5 * (interpolation_grid[:-1] + interpolation_grid[1:])
+            alt = ds[alt_dim].values
+            # bin variables along height, bins are right-open intervals, except the last.
+            # The bin index is computed once and all variables are summed and counted
+            # with one bincount each, using one block of bins per variable.
+            bin_idx = np.searchsorted(interpolation_grid, alt, side="right") - 1
+            bin_idx[alt == interpolation_grid[-1]] -= 1
+            in_grid = (bin_idx >= 0) & (bin_idx < nbins)
+            data = {var: ds[var].values for var in variables}
+            if p_log:
+                # average pressure in log space
+                data["p"] = np.log(data["p"])
+            # casting necessary for time
+            values = np.stack([data[var].astype(np.float64) for var in variables])
+            valid = in_grid & ~np.stack([np.isnan(data[var]) for var in variables])
+            flat_idx = (np.arange(len(variables))[:, None] * nbins + bin_idx)[valid]
+            counts = np.bincount(flat_idx, minlength=len(variables) * nbins).reshape(
+                len(variables), nbins
+            )
+            sums = np.bincount(
+                flat_idx, weights=values[valid], minlength=len(variables) * nbins
+            ).reshape(len(variables), nbins)
+            means = np.divide(
+                sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0
+            )
+            if interpolate:
+                # interpolate missing values up to max_gap_fill meters
+                means = _interpolate_max_gap(means, bin_centers, max_gap_fill)
+
+            bin_coords = {bin_dim: (bin_dim, bin_centers, ds[alt_dim].attrs)}
             mean_ds = {}
             count_dict = {}
-            # bin variables along height, bins are right-open intervals, except the last
-            for var in [
-                "u",
-                "v",
-                "q",
-                "p",
-                "theta",
-                "lat",
-                "lon",
-                "gpsalt",
-                "time",
-                "alt",
-            ]:
-                if (var in ds.variables) and (var not in ds.dims):
-                    count_dict[var] = histogram(
-                        ds[alt_dim].where(~np.isnan(ds[var])),
-                        bins=interpolation_grid,
-                        dim=[alt_dim],
-                    )
-
-                    new_ds = (
-                        histogram(
-                            ds[alt_dim].where(~np.isnan(ds[var])),
-                            bins=interpolation_grid,
-                            dim=[alt_dim],
-                            weights=ds[var]
-                            .astype(np.float64)
-                            .where(~np.isnan(ds[var])),
-                        )  # casting necessary for time
-                        / count_dict[var]
-                    )
-                    new_ds.name = var
-                    new_ds = new_ds.assign_attrs(ds[var].attrs)
-                    mean_ds[var] = new_ds.copy()
+            for i, var in enumerate(variables):
+                count_dict[var] = xr.DataArray(
+                    counts[i], dims=bin_dim, coords=bin_coords
+                )
+                mean_ds[var] = xr.DataArray(
+                    means[i],
+                    dims=bin_dim,
+                    coords=bin_coords,
+                    name=var,
+                    attrs=ds[var].attrs,
+                )
             interp_ds = xr.Dataset(mean_ds)
             count_dict.pop("time")
             self.count_dict = count_dict
-            interp_ds = self.add_N_values(interp_ds)
-            # interpolate missing values up to max_gap_fill meters
+            interp_ds = self.add_N_values(interp_ds).rename({bin_dim: alt_dim})
             if interpolate:
-                interp_ds = (
-                    interp_ds.transpose()
-                    .interpolate_na(
-                        dim=f"{alt_dim}_bin", max_gap=max_gap_fill, use_coordinate=True
-                    )
-                    .rename({f"{alt_dim}_bin": alt_dim})
-                )
                 interp_ds = self.add_m_values(interp_ds)
-
-            else:
-                interp_ds = interp_ds.rename({f"{alt_dim}_bin": alt_dim})
             interp_ds[alt_dim].attrs.update(ds[alt_dim].attrs)
             time_type = ds["time"].values.dtype
             time_attrs = interp_ds.time.attrs
@@ -1400,9 +1743,8 @@ class Sonde:
             ).drop_vars("time")
 
         if p_log:
-            interp_ds = interp_ds.assign(
-                p=(interp_ds.p.dims, np.exp(interp_ds.p.values), interp_ds.p.attrs)
-            )
+            # interp_ds only holds arrays created above, so transform back in place
+            np.exp(interp_ds.p.values, out=interp_ds.p.values)
         self.interim_l3_ds = interp_ds
         return self
 
@@ -1421,23 +1763,18 @@ class Sonde:
         alt_dim = self.alt_dim
         count_dict = self.count_dict
 
+        N_vars = {}
         for variable, Nvar in count_dict.items():
-            N_name = f"{variable}_N_qc"
             N_attrs = dict(
                 long_name=f"Number of values per bin for {variable}",
                 units="1",
             )
-            Nvar = Nvar.rename({alt_dim + "_bin": alt_dim})
-
-            prep_l3 = prep_l3.assign(
-                {
-                    N_name: (
-                        alt_dim,
-                        Nvar.astype(int).values,
-                        N_attrs,
-                    )
-                }
+            N_vars[f"{variable}_N_qc"] = (
+                alt_dim,
+                Nvar.values.astype(np.int16),
+                N_attrs,
             )
+        prep_l3 = prep_l3.assign(N_vars)
         return prep_l3
 
     def add_m_values(self, prep_l3):
@@ -1454,32 +1791,24 @@ class Sonde:
         """
         alt_dim = self.alt_dim
         count_dict = self.count_dict
+        m_vars = {}
         for variable in count_dict.keys():
-            Nvar = prep_l3[f"{variable}_N_qc"]
-            n_mask = Nvar.where(~np.isnan(Nvar), 0)
-            int_mask = prep_l3[variable].where(~np.isnan(prep_l3[variable]), 0)
-
-            m_mask = np.invert(n_mask.astype(bool)) & int_mask.astype(bool)
-            m = xr.where(Nvar > 0, x=2, y=0)
-            m = xr.where(m_mask, x=1, y=m)
+            Nvar = prep_l3[f"{variable}_N_qc"].values
+            values = prep_l3[variable].values
+            # bins without raw data that have a (non-zero) value after interpolation
+            m_mask = (Nvar == 0) & ~np.isnan(values) & (values != 0)
+            # flag values are 0, 1 and 2, so int8 is sufficient
+            m = np.where(Nvar > 0, 2, 0).astype(np.int8)
+            m[m_mask] = 1
 
-            m_name = f"{variable}_m_qc"
             m_attrs = {
                 "long_name": f"interp method for {variable}",
                 "standard_name": "status_flag",
                 "flag_values": "0, 1, 2",
                 "flag_meanings": "no_data interpolated_no_raw_data average_over_raw_data",
             }
-            prep_l3 = prep_l3.assign(
-                {
-                    m_name: (
-                        alt_dim,
-                        m.astype(int).values,
-                        m_attrs,
-                    )
-                }
-            )
-        return prep_l3
+            m_vars[f"{variable}_m_qc"] = (alt_dim, m, m_attrs)
+        return prep_l3.assign(m_vars)
 
     def remove_N_m_duplicates(self):
         """
@@ -1493,42 +1822,37 @@ class Sonde:
             self: The updated sonde with the modified dataset.
         """
         ds = self.interim_l3_ds
-        nm_vars = ["lat", "u", "p", "q", "theta"]
+        nm_vars = {"lat", "u", "p", "q", "theta"}
+        renames = {
+            "lat_N_qc": "gpspos_N_qc",
+            "u_N_qc": "gps_N_qc",
+        }
+        flags = ["N"]
+        pairs = [("u_N_qc", "v_N_qc")]
         if "lat_m_qc" in ds.variables:
-            np.testing.assert_array_equal(
-                ds.lat_m_qc.values,
-                ds.lon_m_qc.values,
-                err_msg="lat_m_qc and lon_m_qc not identical",
-            )
-            np.testing.assert_array_equal(
-                ds.u_m_qc.values,
-                ds.v_m_qc.values,
-                err_msg="v_m_qc and u_m_qc not identical",
-            )
-            ds = ds.rename(
+            pairs += [("lat_m_qc", "lon_m_qc"), ("u_m_qc", "v_m_qc")]
+            renames.update(
                 {
                     "lat_m_qc": "gpspos_m_qc",
                     "u_m_qc": "gps_m_qc",
                 }
-            ).drop_vars(
-                [f"{var}_m_qc" for var in ds.variables if var not in nm_vars],
-                errors="ignore",
             )
-        np.testing.assert_array_equal(
-            ds.u_N_qc.values,
-            ds.v_N_qc.values,
-            err_msg="v_N_qc and u_N_qc not identical",
-        )
+            flags.append("m")
+        # the flags are integers, so a plain comparison is sufficient
+        for var1, var2 in pairs:
+            if not np.array_equal(ds[var1].values, ds[var2].values):
+                raise AssertionError(f"{var1} and {var2} not identical")
 
+        # drop the duplicates of all flags in one pass over the variables
         ds = ds.drop_vars(
-            [f"{var}_N_qc" for var in ds.variables if var not in nm_vars],
+            [
+                f"{var}_{flag}_qc"
+                for var in ds.variables
+                if var not in nm_vars
+                for flag in flags
+            ],
             errors="ignore",
-        ).rename(
-            {
-                "lat_N_qc": "gpspos_N_qc",
-                "u_N_qc": "gps_N_qc",
-            }
-        )
+        ).rename(renames)
         self.interim_l3_ds = ds
 
         return self
@@ -1592,34 +1916,24 @@ class Sonde:
         ds = self.interim_l3_ds
         l2_ds = self.l2_ds
         if essential_attrs is None:
-            try:
-                essential_attrs = hh.l3_coords
-            except AttributeError:
-                essential_attrs = {
-                    "sonde_time": {
-                        "time_zone": "UTC",
-                        "long_name": "dropsonde launch time",
-                    }
-                }
+            essential_attrs = hh.l3_coords
 
+        new_vars = {}
         for attr, value in l2_ds.attrs.items():
-            splt = attr.split("(")
-            var_name = splt[0][:-1]
-            if var_name in list(essential_attrs.keys()):
-                var_attrs = essential_attrs[var_name]
-                ds = ds.assign(
-                    {var_name: (self.sonde_dim, [l2_ds.attrs[attr]], var_attrs)}
-                )
-        ds = ds.assign(
-            dict(
-                sonde_time=(
+            var_name = _attr_var_name(attr)
+            if var_name in essential_attrs:
+                new_vars[var_name] = (
                     self.sonde_dim,
-                    [np.datetime64(self.launch_time, "ns")],
-                    essential_attrs["sonde_time"],
+                    [value],
+                    essential_attrs[var_name],
                 )
-            )
+        new_vars["sonde_time"] = (
+            self.sonde_dim,
+            [np.datetime64(self.launch_time, "ns")],
+            essential_attrs["sonde_time"],
         )
-        self.attrs = ds.attrs.keys()
+        ds = ds.assign(new_vars)
+        self.attrs = list(ds.attrs.keys())
         self.interim_l3_ds = ds
 
         return self
@@ -1633,7 +1947,7 @@ class Sonde:
         """
         ds = self.interim_l3_ds
         new_coords = {
-            coord: (self.sonde_dim, np.reshape(ds[coord].values, (1,)), ds[coord].attrs)
+            coord: (self.sonde_dim, ds[coord].values.reshape(1), ds[coord].attrs)
             for coord in hh.l3_coords
             if coord in ds.variables
         }
@@ -1654,6 +1968,7 @@ class Sonde:
         Returns:
             self: The instance with updated `interim_l3_ds` including quality control flags.
         """
+        qc = self.qc
         ds = self.interim_l3_ds
 
         for var in ds.variables:
@@ -1664,38 +1979,26 @@ class Sonde:
         else:
             if keep == "all":
                 keep = (
-                    [f"{var}_qc" for var in list(self.qc.qc_by_var.keys())]
-                    + list(self.qc.qc_details.keys())
+                    [f"{var}_qc" for var in list(qc.qc_by_var.keys())]
+                    + list(qc.qc_details.keys())
                     + ["alt_near_gpsalt", "altitude_source"]
                 )
-                for variable in self.qc.qc_vars:
-                    ds = self.qc.add_variable_flags_to_ds(ds, variable, details=True)
-                if (not np.isin("q", self.qc.qc_vars)) and np.isin(
-                    "rh", self.qc.qc_vars
-                ):
-                    ds = self.qc.add_variable_flags_to_ds(
-                        ds, "rh", add_to="q", details=True
-                    )
-                if (not np.isin("theta", self.qc.qc_vars)) and np.isin(
-                    "ta", self.qc.qc_vars
-                ):
-                    ds = self.qc.add_variable_flags_to_ds(
+                for variable in qc.qc_vars:
+                    ds = qc.add_variable_flags_to_ds(ds, variable, details=True)
+                if ("q" not in qc.qc_vars) and ("rh" in qc.qc_vars):
+                    ds = qc.add_variable_flags_to_ds(ds, "rh", add_to="q", details=True)
+                if ("theta" not in qc.qc_vars) and ("ta" in qc.qc_vars):
+                    ds = qc.add_variable_flags_to_ds(
                         ds, "ta", add_to="theta", details=True
                     )
-                ds = self.qc.add_non_var_qc_to_ds(ds)
+                ds = qc.add_non_var_qc_to_ds(ds)
             elif keep == "var_flags":
-                keep = [f"{var}_qc" for var in list(self.qc.qc_by_var.keys())] + [
-                    "sonde_qc"
-                ]
-                for var in self.qc.qc_by_var.keys():
+                keep = [f"{var}_qc" for var in list(qc.qc_by_var.keys())] + ["sonde_qc"]
+                for var in qc.qc_by_var.keys():
                     ds = hx.add_ancillary_var(ds, var, var + "_qc")
-                if (not np.isin("q", self.qc.qc_vars)) and np.isin(
-                    "rh", self.qc.qc_vars
-                ):
+                if ("q" not in qc.qc_vars) and ("rh" in qc.qc_vars):
                     ds = hx.add_ancillary_var(ds, "q", "rh_qc")
-                if (not np.isin("theta", self.qc.qc_vars)) and np.isin(
-                    "ta", self.qc.qc_vars
-                ):
+                if ("theta" not in qc.qc_vars) and ("ta" in qc.qc_vars):
                     ds = hx.add_ancillary_var(ds, "theta", "ta_qc")
 
             else:
@@ -1722,34 +2025,35 @@ class Sonde:
         self.history = history
         return self
 
-    def save_interim_l3(self):
+    def save_interim_l3(self, complevel: int = None):
         """
         Save the interim Level 3 dataset to a specified directory.
 
+        Args:
+            complevel (int, optional): The zlib compression level (1-9) of the variables.
+                                       Default: the netCDF default (4)
+
         Returns:
             self: The instance after saving the `interim_l3_ds`.
         """
         ds = self.interim_l3_ds
         ds.attrs = {}
         ds.attrs.update(
-            self.global_attrs["global"],
-        )
-        ds.attrs.update(
-            self.global_attrs["l3"],
-        )
-        ds.attrs.update(
-            dict(
-                history=self.history,
-                title=self.global_attrs["l3"].get(
+            {
+                **self.global_attrs["global"],
+                **self.global_attrs["l3"],
+                "history": self.history,
+                "title": self.global_attrs["l3"].get(
                     "title",
                     self.global_attrs.get("title", "Dropsonde Data") + " Level_3",
                 ),
-            )
+            }
         )
         hx.write_ds(
             ds=ds,
             dir=self.interim_l3_dir,
             filename=self.interim_l3_filename,
+            complevel=complevel,
             object_dims=(self.sonde_dim,),
             alt_dim=self.alt_dim,
         )
@@ -1767,27 +2071,264 @@ class Sonde:
         Returns:
             self: The instance with the updated dataset containing all expected coordinates.
         """
-        ds = self.interim_l3_ds
-        missing_coords = set(hh.l3_coords.keys()) - set(ds.coords)
-        for coord in missing_coords:
-            ds = ds.assign_coords(
-                {
-                    coord: (
-                        (self.sonde_dim,),
-                        np.full(ds.sizes[self.sonde_dim], np.nan),
-                        hh.l3_coords[coord],
-                    )
-                }
-            )
-        self.interim_l3_ds = ds
+        self.interim_l3_ds = _ensure_coords(
+            self.interim_l3_ds, hh.l3_coords, self.sonde_dim
+        )
         return self
 
 
-@dataclass(order=True)
+def _add_aspen_ds(sonde, **kwargs):
+    sonde = sonde.add_aspen_ds(**kwargs)
+    if sonde is not None:
+        # read the post-ASPEN file while it is open in the worker, so that the
+        # main process receives the data and does not reopen every file
+        sonde.aspen_ds.load().close()
+    return sonde
+
+
+def run_aspen_batch(
+    sondes: dict,
+    max_workers: int = None,
+    run_aspen_args: dict = None,
+    add_aspen_ds_args: dict = None,
+) -> dict:
+    """
+    Runs ASPEN and reads the post-ASPEN dataset for a dictionary of sondes.
+
+    ASPEN is run with `run_aspen_jobs`, i.e. with one docker container per directory and at most
+    `max_workers` containers at a time. Afterwards, worker processes call `Sonde.add_aspen_ds`, load the
+    post-ASPEN dataset into memory and return the updated sonde.
+
+    Parameters
+    ----------
+    sondes : dict
+        A dictionary of Sonde objects.
+    max_workers : int, optional
+        The maximum number of worker processes and docker containers. Defaults to the number of CPUs.
+    run_aspen_args : dict, optional
+        Arguments of `Sonde.run_aspen`, passed to `Sonde.prepare_aspen_job`.
+    add_aspen_ds_args : dict, optional
+        Arguments passed to `Sonde.add_aspen_ds`, e.g. `engine`.
+
+    Returns
+    -------
+    dict
+        A dictionary of the processed Sonde objects. Sondes for which `add_aspen_ds` returned None are dropped,
+        sondes with `cont` set to False are passed on unchanged.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    if run_aspen_args is None:
+        run_aspen_args = {}
+    if add_aspen_ds_args is None:
+        add_aspen_ds_args = {}
+    run_aspen_jobs(
+        [
+            sonde.prepare_aspen_job(**run_aspen_args)
+            for sonde in sondes.values()
+            if sonde.cont
+        ],
+        max_workers=max_workers,
+    )
+    processed = {}
+    with ProcessPoolExecutor(max_workers=int(max_workers)) as executor:
+        futures = {
+            key: executor.submit(_add_aspen_ds, sonde, **add_aspen_ds_args)
+            for key, sonde in sondes.items()
+            if sonde.cont
+        }
+        for key, sonde in sondes.items():
+            if key in futures:
+                result = futures[key].result()
+                if result is not None:
+                    processed[key] = result
+            else:
+                processed[key] = sonde
+    return processed
+
+
+def _write_l2(sonde, l2_dir=None, **kwargs):
+    return sonde.write_l2(l2_dir, **kwargs)
+
+
+def write_l2_batch(
+    sondes: dict, l2_dir: str = None, max_workers: int = None, **kwargs
+) -> dict:
+    """
+    Writes the L2 files for a dictionary of sondes in parallel processes.
+
+    Processes are used instead of threads, because the netCDF and HDF5 libraries
+    are not thread-safe.
+
+    Parameters
+    ----------
+    sondes : dict
+        A dictionary of Sonde objects.
+    l2_dir : str, optional
+        The directory to write the L2 files to. Default is the `l2_dir` attribute of each sonde.
+    max_workers : int, optional
+        The maximum number of worker processes. Defaults to the number of CPUs.
+    **kwargs
+        Further arguments passed to `Sonde.write_l2`, e.g. `complevel`.
+
+    Returns
+    -------
+    dict
+        A dictionary of the Sonde objects after writing. Sondes with `cont` set to False are not written.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    written = {}
+    with ProcessPoolExecutor(max_workers=int(max_workers)) as executor:
+        futures = {
+            key: executor.submit(_write_l2, sonde, l2_dir, **kwargs)
+            for key, sonde in sondes.items()
+            if sonde.cont
+        }
+        for key, sonde in sondes.items():
+            if key in futures:
+                written[key] = futures[key].result()
+            else:
+                written[key] = sonde
+    return written
+
+
+def _apply_sonde_methods(sonde, calls):
+    for function_name, kwargs in calls:
+        if sonde.cont:
+            sonde = getattr(Sonde, function_name)(sonde, **kwargs)
+            if sonde is None:
+                return None
+    return sonde
+
+
+def apply_sonde_methods_batch(
+    sondes: dict, calls: list, max_workers: int = None
+) -> dict:
+    """
+    Applies a chain of Sonde methods to a dictionary of sondes, processing the sondes in parallel processes.
+
+    Each worker applies all methods to one sonde, one after another, and returns the updated sonde.
+    As when applying the methods one by one, a method is only applied if the sonde's `cont` attribute is True.
+
+    Parameters
+    ----------
+    sondes : dict
+        A dictionary of Sonde objects.
+    calls : list
+        A list of (method name, keyword arguments) tuples.
+    max_workers : int, optional
+        The maximum number of worker processes. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    dict
+        A dictionary of the processed Sonde objects. Sondes for which a method returned None are dropped.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    processed = {}
+    with ProcessPoolExecutor(max_workers=int(max_workers)) as executor:
+        futures = {
+            key: executor.submit(_apply_sonde_methods, sonde, calls)
+            for key, sonde in sondes.items()
+        }
+        for key, future in futures.items():
+            result = future.result()
+            if result is not None:
+                processed[key] = result
+    return processed
+
+
+def _interpolate_max_gap(values, coord, max_gap):
+    """
+    Linearly interpolate NaN gaps along the last axis that are at most `max_gap` wide.
+
+    This matches ``xr.DataArray.interpolate_na(max_gap=max_gap, use_coordinate=True)``:
+    the width of a gap is the distance between the valid values enclosing it, and
+    leading and trailing NaNs are not filled.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Array of shape (..., n) with the values to fill.
+    coord : np.ndarray
+        Monotonically increasing coordinate of length n.
+    max_gap : float
+        The maximum width of a gap to fill, in units of `coord`.
+
+    Returns
+    -------
+    np.ndarray
+        Copy of `values` with the gaps filled.
+    """
+    values = np.asarray(values)
+    values = np.array(values, dtype=values.dtype if values.dtype.kind == "f" else float)
+    n = coord.size
+    positions = np.arange(n)
+    for row in values.reshape(-1, n):
+        valid = ~np.isnan(row)
+        if valid.all() or not valid.any():
+            continue
+        prev_valid = np.maximum.accumulate(np.where(valid, positions, -1))
+        next_valid = np.minimum.accumulate(np.where(valid, positions, n)[::-1])[::-1]
+        fill = ~valid & (prev_valid >= 0) & (next_valid < n)
+        fill[fill] = coord[next_valid[fill]] - coord[prev_valid[fill]] <= max_gap
+        row[fill] = np.interp(coord[fill], coord[valid], row[valid])
+    return values
+
+
+def _ensure_coords(ds, coords, sonde_dim):
+    """
+    Adds coordinates that are missing in a sonde dataset, filled with NaN.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        The dataset of a single sonde.
+    coords : dict
+        Coordinate names and their attributes that every sonde should have.
+    sonde_dim : str
+        The sonde dimension along which the missing coordinates are defined.
+
+    Returns
+    -------
+    xr.Dataset
+        The dataset with all coordinates in `coords`.
+    """
+    missing_coords = [coord for coord in coords if coord not in ds.coords]
+    if not missing_coords:
+        return ds
+    return ds.assign_coords(
+        {
+            coord: (
+                (sonde_dim,),
+                np.full(ds.sizes[sonde_dim], np.nan),
+                coords[coord],
+            )
+            for coord in missing_coords
+        }
+    )
+
+
+@dataclass(order=True, slots=True)
 class Gridded:
     sondes: dict
     global_attrs: dict
     circles: dict = None
+    # attributes set while processing the gridded data
+    _l3_ds: xr.Dataset = field(init=False, repr=False, compare=False)
+    _interim_l4_ds: xr.Dataset = field(init=False, repr=False, compare=False)
+    _versions: tuple = field(init=False, repr=False, compare=False)
+    alt_dim: str = field(init=False, repr=False, compare=False)
+    sonde_dim: str = field(init=False, repr=False, compare=False)
+    concat_sonde_ds: xr.Dataset = field(init=False, repr=False, compare=False)
+    history: str = field(init=False, repr=False, compare=False)
+    l3_dir: str = field(init=False, repr=False, compare=False)
+    l3_filename: str = field(init=False, repr=False, compare=False)
+    l4_dir: str = field(init=False, repr=False, compare=False)
+    l4_filename: str = field(init=False, repr=False, compare=False)
+    segments: Any = field(init=False, repr=False, compare=False)
 
     @property
     def l3_ds(self):
@@ -1796,6 +2337,10 @@ class Gridded:
     def set_l3_ds(self, ds):
         self._l3_ds = ds
 
+    @property
+    def _first_sonde(self):
+        return next(iter(self.sondes.values()))
+
     def __post_init__(self):
         """
         Initializes the Gridded object, ensuring that global attributes are set to an empty dictionary if not provided.
@@ -1803,6 +2348,36 @@ class Gridded:
         if self.global_attrs is None:
             self.global_attrs = {}
 
+    def _collect_versions(self):
+        """
+        Collects the Aspen and pydropsonde versions from the history of all sondes.
+
+        The first two lines of each history hold the Aspen and the pydropsonde
+        version, so both are gathered in a single pass over the sondes. The
+        result is cached on the object and recomputed when the sondes or their
+        datasets change.
+
+        Returns
+        -------
+        tuple of set
+            The distinct Aspen versions and the distinct pydropsonde versions.
+        """
+        key = tuple(id(sonde.interim_l3_ds) for sonde in self.sondes.values())
+        cached_key, versions = getattr(self, "_versions", (None, None))
+        if cached_key != key:
+            aspen_versions = set()
+            pydrop_versions = set()
+            for sonde in self.sondes.values():
+                # only the first two lines are needed, leave the rest unsplit
+                aspen_line, pydrop_line = sonde.interim_l3_ds.attrs["history"].split(
+                    "\n", 2
+                )[:2]
+                aspen_versions.add(aspen_line.split("Aspen ")[1])
+                pydrop_versions.add(pydrop_line.split("pydropsonde ")[-1])
+            versions = (aspen_versions, pydrop_versions)
+            self._versions = (key, versions)
+        return versions
+
     def check_aspen_version(self):
         """
         Checks if all sondes have been processed with the same Aspen version.
@@ -1817,12 +2392,8 @@ class Gridded:
         self : Gridded
             Returns the Gridded object.
         """
-        list_of_l2_hist = [
-            sonde.interim_l3_ds.attrs["history"].splitlines()[0]
-            for sonde in self.sondes.values()
-        ]
-        aspen_versions = [asp.split("Aspen ")[1] for asp in list_of_l2_hist]
-        if not aspen_versions.count(aspen_versions[0]) == len(aspen_versions):
+        aspen_versions, _ = self._collect_versions()
+        if len(aspen_versions) != 1:
             raise ValueError(
                 "Not all sondes have been processed with the same Aspen version"
             )
@@ -1842,12 +2413,8 @@ class Gridded:
         self : Gridded
             Returns the Gridded object.
         """
-        list_of_l2_hist = [
-            sonde.interim_l3_ds.attrs["history"].splitlines()[1]
-            for sonde in self.sondes.values()
-        ]
-        pydrop_versions = [pydr.split("pydropsonde ")[-1] for pydr in list_of_l2_hist]
-        if not pydrop_versions.count(pydrop_versions[0]) == len(pydrop_versions):
+        _, pydrop_versions = self._collect_versions()
+        if len(pydrop_versions) != 1:
             raise ValueError(
                 "Not all sondes have been processed with the same pydropsonde version to get level 3"
             )
@@ -1862,9 +2429,7 @@ class Gridded:
         self : Gridded
             Returns the Gridded object.
         """
-        first_sonde_history = list(self.sondes.values())[0].interim_l3_ds.attrs[
-            "history"
-        ]
+        first_sonde_history = self._first_sonde.interim_l3_ds.attrs["history"]
         new_hist = ""
         for line_nb, line in enumerate(first_sonde_history.splitlines()):
             split_line = line.split(" ", 1)
@@ -1887,7 +2452,7 @@ class Gridded:
         self : Gridded
             Returns the Gridded object.
         """
-        sonde = list(self.sondes.values())[0]
+        sonde = self._first_sonde
         self.alt_dim = sonde.alt_dim
         self.sonde_dim = sonde.sonde_dim
         return self
@@ -1910,35 +2475,22 @@ class Gridded:
         """
         if sortby is None:
             sortby = list(hh.l3_coords.keys())[0]
-        list_of_l2_ds = [sonde.interim_l3_ds for sonde in self.sondes.values()]
-        try:
-            ds = xr.concat(
-                list_of_l2_ds,
-                dim=self.sonde_dim,
-                join="exact",
-                combine_attrs="drop_conflicts",
-            ).sortby(sortby)
-        except AttributeError:
-            if coords is None:
-                coords = hh.l3_coords
-            for i, l2_ds in enumerate(list_of_l2_ds):
-                missing_coords = set(coords.keys()) - set(l2_ds.coords)
-                list_of_l2_ds[i] = l2_ds.assign_coords(
-                    {
-                        coord: (
-                            (self.sonde_dim,),
-                            np.full(ds.sizes[self.sonde_dim], np.nan),
-                            coords[coord],
-                        )
-                        for coord in missing_coords
-                    }
-                )
-            ds = xr.concat(
-                list_of_l2_ds,
-                dim=self.sonde_dim,
-                join="exact",
-                combine_attrs="drop_conflicts",
-            ).sortby(sortby)
+        if coords is None:
+            coords = hh.l3_coords
+        list_of_l2_ds = [
+            _ensure_coords(sonde.interim_l3_ds, coords, self.sonde_dim)
+            for sonde in self.sondes.values()
+        ]
+        # all sondes share the altitude grid, which join="exact" still verifies,
+        # so the remaining coordinates need no pairwise comparison
+        ds = xr.concat(
+            list_of_l2_ds,
+            dim=self.sonde_dim,
+            coords="minimal",
+            compat="override",
+            join="exact",
+            combine_attrs="drop_conflicts",
+        ).sortby(sortby)
 
         self.concat_sonde_ds = ds
         return self
@@ -1951,26 +2503,20 @@ class Gridded:
         return self
 
     def concat_circles(self):
-        count = []
-        data = []
-        circle_ids = []
-
-        for circle_id, circle in self.circles.items():
-            circle_ds = circle.circle_ds
-            circle_ds = circle_ds.sortby("sonde_time")
-
-            vars_sonde_dim = []
-            vars_circle_dim = []
-
-            for var in circle_ds.data_vars:
-                if "sonde" in circle_ds[var].dims:
-                    vars_sonde_dim.append(var)
-                else:
-                    vars_circle_dim.append(var)
-
-            count.append(len(circle_ds.sonde_time))
-            data.append(circle_ds)
-            circle_ids.append(circle_id)
+        circle_ids = list(self.circles.keys())
+        data = [
+            circle.circle_ds.sortby("sonde_time") for circle in self.circles.values()
+        ]
+        count = [len(circle_ds.sonde_time) for circle_ds in data]
+
+        # all circles hold the same variables, so they are classified once
+        vars_sonde_dim = []
+        vars_circle_dim = []
+        for var in data[0].data_vars:
+            if "sonde" in data[0][var].dims:
+                vars_sonde_dim.append(var)
+            else:
+                vars_circle_dim.append(var)
 
         concatenated_sonde_ds = xr.concat(
             [ds[vars_sonde_dim] for ds in data],
@@ -1988,11 +2534,10 @@ class Gridded:
             compat="override",
         )
 
-        sonde_ds_filtered = concatenated_sonde_ds[vars_sonde_dim]
-        circle_ds_filtered = concatenated_circle_ds[vars_circle_dim]
-
         concatenated_ds = xr.merge(
-            [sonde_ds_filtered, circle_ds_filtered], compat="override", join="outer"
+            [concatenated_sonde_ds, concatenated_circle_ds],
+            compat="override",
+            join="outer",
         )
         concatenated_ds = concatenated_ds.assign(circle_id=("circle", circle_ids))
 
@@ -2034,11 +2579,11 @@ class Gridded:
         if l3_dir:
             self.l3_dir = l3_dir
         elif self.sondes is not None:
+            sonde = self._first_sonde
             self.l3_dir = (
-                list(self.sondes.values())[0]
-                .l2_dir.replace("Level_2", "Level_3")
-                .replace(list(self.sondes.values())[0].flight_id, "")
-                .replace(list(self.sondes.values())[0].platform_id, "")
+                sonde.l2_dir.replace("Level_2", "Level_3")
+                .replace(sonde.flight_id, "")
+                .replace(sonde.platform_id, "")
             )
         else:
             raise ValueError("No sondes and no l3 directory given, cannot continue ")
@@ -2077,7 +2622,7 @@ class Gridded:
         self.history = history
         return self
 
-    def write_l3(self, l3_dir: str = None):
+    def write_l3(self, l3_dir: str = None, complevel: int = None):
         """
         Writes the L3 file to the specified directory.
 
@@ -2085,6 +2630,8 @@ class Gridded:
         ----------
         l3_dir : str, optional
             The directory to write the L3 file to.
+        complevel : int, optional
+            The zlib compression level (1-9) of the variables in netCDF files. The default is the netCDF default (4).
 
         Returns
         -------
@@ -2103,6 +2650,7 @@ class Gridded:
             ds=self.concat_sonde_ds,
             dir=l3_dir,
             filename=self.l3_filename,
+            complevel=complevel,
             object_dims=(self.sonde_dim,),
             alt_dim=self.alt_dim,
         )
@@ -2167,8 +2715,8 @@ class Gridded:
             warnings.warn("No segmentation file provided. No circle analysis done")
             return None
         segmentation = rr.get_flight_segmentation(yaml_file)
-        platform_ids = set(self.l3_ds.platform_id.values)
-        flight_ids = set(self.l3_ds.flight_id.values)
+        platform_ids = set(np.unique(self.l3_ds.platform_id.values).tolist())
+        flight_ids = set(np.unique(self.l3_ds.flight_id.values).tolist())
         self.segments = sorted(
             [
                 {
@@ -2222,19 +2770,15 @@ class Gridded:
         ds = self._interim_l4_ds
         ds.attrs = {}
         ds.attrs.update(
-            self.global_attrs["global"],
-        )
-        ds.attrs.update(
-            self.global_attrs["l4"],
-        )
-        ds.attrs.update(
-            dict(
-                history=self.history,
-                title=self.global_attrs["l4"].get(
+            {
+                **self.global_attrs["global"],
+                **self.global_attrs["l4"],
+                "history": self.history,
+                "title": self.global_attrs["l4"].get(
                     "title",
                     self.global_attrs.get("title", "Dropsonde Data") + " Level_4",
                 ),
-            )
+            }
         )
         hx.write_ds(
             ds=ds,
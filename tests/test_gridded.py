@@ -1,4 +1,7 @@
 import pytest
+from types import SimpleNamespace
+
+import xarray as xr
 from pydropsonde.processor import Gridded
 
 sondes = None
@@ -23,3 +26,56 @@ def test_l3_dir_name(gridded):
 def test_l3_default(gridded):
     gridded.get_l3_filename()
     assert gridded.l3_filename == l3_default
+
+
+def test_concat_sondes_fills_missing_coords():
+    ds = xr.Dataset(
+        {"ta": (("sonde_id", "altitude"), [[1.0, 2.0]])},
+        coords={
+            "sonde_id": ["a"],
+            "altitude": [0, 10],
+            "aircraft_latitude": ("sonde_id", [13.0]),
+        },
+    )
+    sondes = {
+        "a": SimpleNamespace(interim_l3_ds=ds),
+        "b": SimpleNamespace(
+            interim_l3_ds=ds.assign_coords(sonde_id=["b"]).drop_vars(
+                "aircraft_latitude"
+            )
+        ),
+    }
+    gridded = Gridded(sondes, None)
+    gridded.sonde_dim = "sonde_id"
+    gridded.concat_sondes(
+        sortby="sonde_id", coords={"aircraft_latitude": {"units": "degrees_north"}}
+    )
+    assert gridded.concat_sonde_ds.sizes["sonde_id"] == 2
+    assert gridded.concat_sonde_ds.aircraft_latitude.isnull().values.tolist() == [
+        False,
+        True,
+    ]
+
+
+def test_check_versions():
+    def sonde(aspen, pydrop):
+        history = (
+            f"2024-01-01T00:00:00 Aspen {aspen} \n"
+            f"2024-01-02T00:00:00 quality control with pydropsonde {pydrop} \n"
+        )
+        return SimpleNamespace(interim_l3_ds=xr.Dataset(attrs={"history": history}))
+
+    gridded = Gridded({"a": sonde("3.4.3", "0.1"), "b": sonde("3.4.3", "0.1")}, None)
+    gridded.check_aspen_version().check_pydropsonde_version()
+
+    gridded = Gridded({"a": sonde("3.4.3", "0.1"), "b": sonde("3.4.6", "0.2")}, None)
+    with pytest.raises(ValueError, match="Aspen"):
+        gridded.check_aspen_version()
+    with pytest.raises(ValueError, match="pydropsonde"):
+        gridded.check_pydropsonde_version()
+
+    gridded.sondes = {"a": sonde("3.4.6", "0.2")}
+    gridded.check_aspen_version().check_pydropsonde_version()
+    gridded.sondes["b"] = sonde("3.4.3", "0.1")
+    with pytest.raises(ValueError, match="Aspen"):
+        gridded.check_aspen_version()
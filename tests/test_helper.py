@@ -1,4 +1,5 @@
 import pydropsonde.helper as hh
+import pydropsonde.helper.xarray_helper as hx
 import numpy as np
 import xarray as xr
 
@@ -42,3 +43,31 @@ def test_rh2q_range():
     assert rh2q.q.isel(alt=0).values > 0.01
     assert rh2q.q.isel(alt=0).values < 0.02
     assert rh2q.q.isel(alt=-1).values < 1e-4
+
+
+def test_write_ds_complevel(tmp_path):
+    hx.write_ds(
+        ds,
+        dir=tmp_path,
+        filename="test.nc",
+        complevel=1,
+        object_dims=("sonde",),
+    )
+    written = xr.open_dataset(tmp_path / "test.nc")
+    assert written.ta.encoding["complevel"] == 1
+    assert written.ta.encoding["zlib"]
+    assert written.p.encoding["chunksizes"] == (10,)
+    written.close()
+
+
+def test_remove_above_alt():
+    ds_alt = xr.Dataset(
+        {
+            "gpsalt": ("time", [100.0, np.nan, 9000.0, 11000.0]),
+            "u": ("time", [1.0, 2.0, 3.0, 4.0], {"units": "m s-1"}),
+        }
+    )
+    result = hx.remove_above_alt(ds_alt, ["u", "gpsalt"], "gpsalt", 10000)
+    np.testing.assert_array_equal(result.u.values, [1.0, 2.0, 3.0, np.nan])
+    np.testing.assert_array_equal(result.gpsalt.values, [100.0, np.nan, 9000.0, np.nan])
+    assert result.u.attrs == {"units": "m s-1"}
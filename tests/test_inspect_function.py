@@ -6,6 +6,7 @@ from pydropsonde.pipeline import (
     get_nondefaults_from_config,
     get_args_for_function,
 )
+from pydropsonde.processor import Sonde
 
 
 # Define a function for testing
@@ -75,3 +76,14 @@ def test_get_args_for_function_no_mandatory(config_and_function):
         ValueError, match="Mandatory argument a not found in config file"
     ):
         get_args_for_function(config, test_func)
+
+
+def test_get_args_for_add_id_variables():
+    config = configparser.ConfigParser()
+    config.read_string(
+        "[MANDATORY]\n"
+        "[processor.Sonde.add_platform_id_variable]\nvariable_name = platform\n"
+        "[processor.Sonde.add_id_variables]\nflight_id_name = flight\n"
+    )
+    result = get_args_for_function(config, Sonde.add_id_variables)
+    assert result == {"platform_id_name": "platform", "flight_id_name": "flight"}
@@ -2,6 +2,7 @@ import pytest
 import xarray as xr
 import numpy as np
 from pydropsonde.processor import Sonde
+import pydropsonde.processor as processor
 
 s_id = "test_this_id"
 flight_id = "test_this_flight"
@@ -170,3 +171,79 @@ class TestGroup:
         print(expected["Nq"])
         assert np.all(new_sonde.interim_l3_ds["q_N_qc"].values == expected["Nq"])
         assert np.all(new_sonde.interim_l3_ds["q_m_qc"].values == expected["mq"])
+        assert new_sonde.interim_l3_ds["q_N_qc"].dtype == np.int16
+        assert new_sonde.interim_l3_ds["q_m_qc"].dtype == np.int8
+
+
+@pytest.mark.parametrize(
+    "bottom_up,expected",
+    [
+        (True, [30.0, np.nan, 25.0, np.nan, np.nan, 15.0, 5.0]),
+        (False, [30.0, 20.0, np.nan, 10.0, np.nan, np.nan, 5.0]),
+    ],
+)
+def test_remove_non_mono_incr_alt(bottom_up, expected):
+    sonde = Sonde(_serial_id=s_id, _launch_time=launch_time)
+    sonde.set_alt_dim("alt")
+    sonde.interim_l3_ds = xr.Dataset(
+        {"alt": ("time", [30.0, 20.0, 25.0, 10.0, np.nan, 15.0, 5.0])},
+        coords={"time": np.arange(7).astype("datetime64[s]")},
+    )
+    with pytest.warns(UserWarning):
+        sonde.remove_non_mono_incr_alt(bottom_up=bottom_up)
+    np.testing.assert_array_equal(sonde.interim_l3_ds.alt.values, expected)
+
+
+def test_remove_N_m_duplicates():
+    sonde = Sonde(_serial_id=s_id, _launch_time=launch_time)
+    flags = {
+        f"{var}_{flag}_qc": ("alt", [1, 2])
+        for var in ["lat", "lon", "u", "v"]
+        for flag in ["N", "m"]
+    }
+    flags.update({var: ("alt", [0.0, 1.0]) for var in ["lat", "lon", "u", "v"]})
+    sonde.interim_l3_ds = xr.Dataset(flags, coords={"alt": [0.0, 10.0]})
+    sonde.remove_N_m_duplicates()
+    assert sorted(sonde.interim_l3_ds.data_vars) == [
+        "gps_N_qc",
+        "gps_m_qc",
+        "gpspos_N_qc",
+        "gpspos_m_qc",
+        "lat",
+        "lon",
+        "u",
+        "v",
+    ]
+
+    sonde.interim_l3_ds = xr.Dataset(flags, coords={"alt": [0.0, 10.0]}).assign(
+        v_N_qc=("alt", [1, 3])
+    )
+    with pytest.raises(AssertionError, match="u_N_qc and v_N_qc not identical"):
+        sonde.remove_N_m_duplicates()
+
+
+def test_interpolate_max_gap():
+    coord = np.arange(0.0, 80.0, 10.0)
+    values = np.array([np.nan, 1.0, np.nan, 3.0, np.nan, np.nan, np.nan, 7.0])
+    expected = xr.DataArray(values, dims="alt", coords={"alt": coord}).interpolate_na(
+        "alt", max_gap=20, use_coordinate=True
+    )
+    result = processor._interpolate_max_gap(values, coord, 20)
+    np.testing.assert_array_equal(result, expected.values)
+    np.testing.assert_array_equal(
+        result, [np.nan, 1.0, 2.0, 3.0, np.nan, np.nan, np.nan, 7.0]
+    )
+
+
+def test_add_qc_to_interim_l3_derived_vars():
+    sonde = Sonde(_serial_id=s_id, _launch_time=launch_time)
+    sonde.qc.set_qc_variables({"rh": "1", "ta": "K"})
+    variables = {var: ("alt", [1.0, 2.0]) for var in ["rh", "ta", "q", "theta"]}
+    sonde.interim_l3_ds = xr.Dataset(variables, coords={"alt": [0.0, 10.0]})
+    sonde.interim_l2_ds = xr.Dataset(
+        {name: ((), np.byte(0)) for name in ["rh_qc", "ta_qc", "sonde_qc"]}
+    )
+    sonde.add_qc_to_interim_l3(keep="var_flags")
+    ds = sonde.interim_l3_ds
+    assert ds.q.attrs["ancillary_variables"] == "rh_qc"
+    assert ds.theta.attrs["ancillary_variables"] == "ta_qc"
@@ -1,7 +1,10 @@
 import pytest
 import os
+import subprocess
+import numpy as np
 import xarray as xr
 from pydropsonde.processor import Sonde
+import pydropsonde.processor as processor
 
 s_id = "test_this_id"
 flight_id = "test_this_flight"
@@ -22,6 +25,19 @@ def test_Sonde_attrs():
     assert TestSonde_withlaunchtime.launch_time == launch_time
 
 
+def test_Sonde_sort_by_launch_time():
+    early = Sonde("b", _launch_time="2020-02-02 20:22:02")
+    late = Sonde("a", _launch_time=np.datetime64("2020-02-03T01:00:00"))
+    assert isinstance(early.sort_index, int)
+    assert sorted([late, early]) == [early, late]
+
+
+def test_Sonde_unknown_launch_time():
+    sonde = Sonde(s_id, _launch_time="UNKNOWN")
+    assert sonde.launch_time == "UNKNOWN"
+    assert not hasattr(sonde, "sort_index")
+
+
 @pytest.fixture
 def tmp_data_directory(tmp_path):
     """
@@ -107,6 +123,10 @@ def test_sonde_level_dir(sonde, temp_afile_launchdetected, temp_afile_dir):
     sonde.add_afile(temp_afile_launchdetected)
     sonde.add_level_dir()
     assert sonde.l0_dir == temp_afile_dir
+    sonde.add_afile(os.path.join(temp_afile_dir, "A20200202_202202.1"))
+    assert sonde._default_postaspenfile == os.path.join(
+        sonde.l1_dir, "D20200202_202202QC.nc"
+    )
 
 
 def test_sonde_add_postaspenfile_with_only_afile(
@@ -136,6 +156,17 @@ def test_sonde_add_aspen_ds(sonde, temp_afile_launchdetected, temp_postaspenfile
     assert sonde.aspen_ds.attrs["SondeId"] == s_id
 
 
+def test_sonde_add_aspen_ds_unknown_engine(
+    sonde, temp_afile_launchdetected, temp_postaspenfile
+):
+    sonde.add_afile(temp_afile_launchdetected)
+    sonde.add_level_dir()
+    sonde.run_aspen(temp_postaspenfile)
+    with pytest.warns(UserWarning, match="not available"):
+        sonde.add_aspen_ds(engine="not_an_engine")
+    assert sonde.aspen_ds.attrs["SondeId"] == s_id
+
+
 def test_sonde_add_aspen_ds_with_mismatched_sonde_id(
     temp_afile_launchdetected, temp_postaspenfile
 ):
@@ -150,3 +181,231 @@ def test_sonde_add_aspen_ds_with_mismatched_sonde_id(
     sonde.add_launch_detect(True)
     with pytest.raises(ValueError):
         sonde.add_aspen_ds()
+
+
+def test_dir_listing_cache(temp_postaspenfile):
+    """
+    Test that a file written after a directory was scanned is found once the listing is invalidated.
+    """
+    l1_dir = os.path.dirname(temp_postaspenfile)
+    assert postaspenfile_name in processor._scan_dir(l1_dir)
+
+    new_name = "new_file_QC.nc"
+    with open(os.path.join(l1_dir, new_name), "w") as f:
+        f.write("")
+    assert new_name not in processor._scan_dir(l1_dir)
+    processor._invalidate_dir(l1_dir)
+    assert new_name in processor._scan_dir(l1_dir)
+    assert processor._scan_dir(l1_dir)[new_name].stat().st_size == 0
+
+
+def test_dir_listing_cache_missing_dir(tmp_path):
+    """
+    Test that a missing directory is scanned once and created when needed.
+    """
+    missing_dir = str(tmp_path / "missing")
+    assert processor._scan_dir(missing_dir) == {}
+    assert missing_dir in processor._dir_cache
+    assert missing_dir in processor._missing_dirs
+    os.mkdir(missing_dir)
+    processor._invalidate_dir(missing_dir)
+    assert missing_dir not in processor._missing_dirs
+
+
+def test_clear_dir_cache(tmp_path):
+    """
+    Test that clearing the cache drops all directory listings.
+    """
+    directory = str(tmp_path)
+    processor._scan_dir(directory)
+    processor._scan_dir(str(tmp_path / "missing"))
+    processor.clear_dir_cache()
+    assert processor._dir_cache == {}
+    assert processor._missing_dirs == set()
+
+
+def test_sonde_add_aspen_ds_invalid_file(sonde, temp_postaspenfile):
+    """
+    Test that an invalid L1 file is skipped and read once it has been fixed.
+    """
+    l1_dir = os.path.dirname(temp_postaspenfile)
+    sonde.postaspenfile = os.path.join(l1_dir, "invalid_QC.nc")
+    with open(sonde.postaspenfile, "w") as f:
+        f.write("")
+    with pytest.warns(UserWarning):
+        assert sonde.add_aspen_ds() is None
+
+    os.replace(temp_postaspenfile, sonde.postaspenfile)
+    assert sonde.add_aspen_ds().aspen_ds.attrs["SondeId"] == s_id
+
+
+def test_run_aspen_batch(sonde, temp_afile_launchdetected, temp_postaspenfile):
+    """
+    Test running ASPEN and adding the ASPEN dataset for several sondes in a process pool.
+    """
+    sonde.add_afile(temp_afile_launchdetected)
+    sonde.add_level_dir()
+    skipped_sonde = Sonde(_serial_id="skipped", cont=False)
+    sondes = processor.run_aspen_batch(
+        {s_id: sonde, "skipped": skipped_sonde}, max_workers=2
+    )
+    assert sondes[s_id].postaspenfile == temp_postaspenfile
+    assert sondes[s_id].aspen_ds.attrs["SondeId"] == s_id
+    assert sondes["skipped"] is skipped_sonde
+
+
+def test_run_aspen_batch_args(sonde, temp_afile_launchdetected, temp_postaspenfile):
+    """
+    Test that the arguments of run_aspen and add_aspen_ds reach the worker processes.
+    """
+    sonde.add_afile(temp_afile_launchdetected)
+    sonde.add_level_dir()
+    postaspenfile = os.path.join(os.path.dirname(temp_postaspenfile), "other_QC.nc")
+    os.replace(temp_postaspenfile, postaspenfile)
+    sondes = processor.run_aspen_batch(
+        {s_id: sonde},
+        max_workers=1,
+        run_aspen_args={"path_to_postaspenfile": postaspenfile},
+        add_aspen_ds_args={"engine": "netcdf4"},
+    )
+    assert sondes[s_id].postaspenfile == postaspenfile
+    assert sondes[s_id].aspen_ds.attrs["SondeId"] == s_id
+
+
+def test_sonde_get_flight_attributes(sonde, temp_afile_dir):
+    """
+    Test reading flight attributes from an A-file.
+    """
+    afile = os.path.join(temp_afile_dir, file_name_launch)
+    with open(afile, "w") as f:
+        f.write(
+            "Launch Obs Done? = 1\n"
+            "True Air Speed (m/s) = 238\n"
+            "MSL Altitude (m) = 14407.3\n"
+            "Geopotential Altitude (m) = 14352.2\n"
+            "Software Notes = Software Version 4.1.0\n"
+        )
+    sonde.add_afile(afile)
+    sonde.get_flight_attributes()
+    assert sonde.flight_attrs == {
+        "true_air_speed_(ms-1)": 238.0,
+        "AVAPS_software_notes": "Software Version 4.1.0\n",
+        "aircraft_msl_altitude_(m)": 14407.3,
+        "aircraft_geopotential_altitude_(m)": 14352.2,
+    }
+
+
+def test_sonde_add_id_variables(sonde):
+    sonde.add_flight_id("test_flight")
+    sonde.add_platform_id("test_platform")
+    sonde.interim_l2_ds = xr.Dataset({"ta": ("time", [280.0, 281.0])})
+    sonde.add_id_variables()
+    ds = sonde.interim_l2_ds
+    assert ds.sonde_id.values == sonde.serial_id
+    assert ds.platform_id.values == "test_platform"
+    assert ds.flight_id.values == "test_flight"
+    assert ds.sonde_id.attrs["cf_role"] == "trajectory_id"
+    assert ds.flight_id.attrs["long_name"] == "flight identifier"
+
+    sonde.interim_l2_ds = xr.Dataset({"ta": ("time", [280.0, 281.0])})
+    sonde.add_platform_id_variable("platform")
+    assert list(sonde.interim_l2_ds.data_vars) == ["ta", "platform"]
+
+
+def test_parse_aspen_time():
+    aspen_time = processor._parse_aspen_time("13 Aug 2024 16:30 UTC")
+    assert aspen_time.isoformat() == "2024-08-13T16:30:00+00:00"
+    assert processor._parse_aspen_time("13 Aug 2024 16:30 UTC") is aspen_time
+
+
+def test_attr_var_name():
+    assert (
+        processor._attr_var_name("aircraft_latitude_(degrees_north)")
+        == "aircraft_latitude"
+    )
+    assert processor._attr_var_name("true_heading_(deg)") == "true_heading"
+
+
+def test_sonde_get_l2_variables_from_string(sonde):
+    sonde.interim_l2_ds = xr.Dataset(
+        {"tdry": ("time", [20.0]), "pres": ("time", [1000.0])}
+    )
+    l2_variables = (
+        "{'tdry': {'rename_to': 'ta', 'attributes': {'units': 'degC'}}, 'pres': {}}"
+    )
+    sonde.get_l2_variables(l2_variables)
+    assert list(sonde.interim_l2_ds.data_vars) == ["ta", "pres"]
+    assert sonde.interim_l2_ds.ta.attrs == {"units": "degC"}
+    assert processor._parse_literal(l2_variables) is processor._parse_literal(
+        l2_variables
+    )
+
+
+def test_sonde_convert_to_si_skip_keeps_aspen_ds(sonde):
+    sonde.set_aspen_ds(
+        xr.Dataset({"ta": ("time", [20.0, 21.0])}, attrs={"SondeId": sonde.serial_id})
+    )
+    sonde.convert_to_si(skip=True)
+    assert sonde.interim_l2_ds is sonde.aspen_ds
+    sonde.sonde_attrs = {"sonde_serial_ID": sonde.serial_id}
+    sonde.add_l2_attributes_to_interim_l2_ds()
+    assert sonde.interim_l2_ds.attrs == {"sonde_serial_ID": sonde.serial_id}
+    assert sonde.aspen_ds.attrs == {"SondeId": sonde.serial_id}
+
+
+def test_aspen_commands(monkeypatch):
+    files = [("D1.1", "D1QC.nc"), ("D2.1", "D2QC.nc")]
+    monkeypatch.setattr(processor, "_aspen_entrypoint", lambda: ["aspen"])
+    (command,) = processor._aspen_commands("l0", "l1", False, files)
+    assert command[-5:-3] == ["--entrypoint", "sh"]
+    assert command[-1] == (
+        "status=0; "
+        "aspen -i /input/D1.1 -n /output/D1QC.nc || status=1; "
+        "aspen -i /input/D2.1 -n /output/D2QC.nc || status=1; "
+        "exit $status"
+    )
+
+    # every file is processed, a failure is reported after all files
+    monkeypatch.setattr(processor, "_aspen_entrypoint", lambda: ["echo"])
+    script = processor._aspen_commands("l0", "l1", False, files)[0][-1]
+    result = subprocess.run(["sh", "-c", script], capture_output=True, text=True)
+    assert result.returncode == 0
+    assert len(result.stdout.splitlines()) == 2
+    monkeypatch.setattr(processor, "_aspen_entrypoint", lambda: ["false"])
+    script = processor._aspen_commands("l0", "l1", False, files)[0][-1]
+    assert subprocess.run(["sh", "-c", script]).returncode == 1
+
+    monkeypatch.setattr(processor, "_aspen_entrypoint", lambda: None)
+    commands = processor._aspen_commands("l0", "l1", True, files)
+    assert len(commands) == 2
+    assert commands[1][-6:] == [
+        "-i",
+        "/input/D2.1",
+        "-n",
+        "/output/D2QC.nc",
+        "-1",
+        "mini-dropsonde",
+    ]
+
+
+def test_aspen_entrypoint_not_cached_on_failure(monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("no docker")
+
+    monkeypatch.setattr(processor, "_aspen_entrypoints", {})
+    monkeypatch.setattr(processor.subprocess, "run", fail)
+    with pytest.warns(UserWarning, match="one container per file"):
+        assert processor._aspen_entrypoint() is None
+    assert processor._aspen_entrypoints == {}
+
+
+def test_apply_sonde_methods_batch(sonde):
+    skipped_sonde = Sonde(_serial_id="skipped", cont=False)
+    sondes = processor.apply_sonde_methods_batch(
+        {s_id: sonde, "skipped": skipped_sonde},
+        [("set_alt_dim", {"alt_dim": "gpsalt"})],
+        max_workers=2,
+    )
+    assert sondes[s_id].alt_dim == "gpsalt"
+    assert sondes[s_id].qc.alt_dim == "gpsalt"
+    assert sondes["skipped"].serial_id == "skipped"